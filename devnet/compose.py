@@ -9,11 +9,13 @@
 # #############################################################################
 
 import argparse
+import functools
+import hashlib
 import os
 import json
 import yaml
 from secp256k1 import PrivateKey
-from typing import TypedDict, Any
+from typing import NotRequired, TypedDict, Any
 import base64
 
 import logging
@@ -21,6 +23,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Use the LibYAML based dumper if it is available
+YamlDumper = getattr(yaml, "CDumper", yaml.Dumper)
+
 
 # DEFAULT_CHAINWEB_NODE_IMAGE = "ghcr.io/kadena-io/chainweb-node:pp-evm"
 DEFAULT_CHAINWEB_NODE_IMAGE = "ghcr.io/kadena-io/evm-devnet-chainweb-node:latest"
@@ -77,6 +82,7 @@ class Service(TypedDict, total=False):
     deploy: dict[str, dict[str, str | int]]
     healthcheck: dict
     build: dict[str, str]
+    cpuset: str
     environment: list[str] | dict[str, str]
     platform: str
     profiles: list[str]
@@ -151,6 +157,54 @@ def config_dir(project_name: str, node_name: str) -> str:
     return f"./config/{project_name}/{node_name}"
 
 
+# #############################################################################
+# Generated Files
+#
+# Generated files are written only if their content changes. This preserves the
+# modification times of unchanged files, so that docker compose does not
+# recreate the containers that use them. The content hashes of all files that
+# are generated for a project are recorded in `generated_files`.
+
+generated_files: dict[str, str] = {}
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(file: str) -> str | None:
+    try:
+        with open(file, "rb") as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def keep_file(file: str) -> None:
+    """
+    Records an existing generated file that is not written again.
+    """
+    generated_files[file] = file_hash(file)  # type: ignore
+
+
+def write_if_changed(file: str, content: str | bytes) -> bool:
+    """
+    Writes the content to the file, unless the file already has the same
+    content. Returns whether the file was written.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    h = content_hash(content)
+    generated_files[file] = h
+    if file_hash(file) == h:
+        return False
+    tmp = f"{file}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, file)
+    return True
+
+
 # #############################################################################
 # Payload Provider Configuration for Consensus
 #
@@ -177,8 +231,9 @@ def jwtsecret_config(project_name, node_name: str, update: bool = False) -> None
     os.makedirs(config_dir(project_name, node_name), exist_ok=True)
     file = f"{config_dir(project_name, node_name)}/jwtsecret"
     if update or not os.path.exists(file):
-        with open(file, "wb") as f:
-            f.write(jwtsecret.encode("ascii"))
+        write_if_changed(file, jwtsecret.encode("ascii"))
+    else:
+        keep_file(file)
 
 
 def payload_provider_config(
@@ -229,8 +284,9 @@ def payload_provider_config(
     }
     os.makedirs(config_dir(project_name, node_name), exist_ok=True)
     file = f"{config_dir(project_name, node_name)}/payload-providers.yaml"
-    with open(file, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
+    write_if_changed(
+        file, yaml.dump(config, Dumper=YamlDumper, default_flow_style=False)
+    )
 
 
 # #############################################################################
@@ -264,13 +320,28 @@ def evm_bootnodes(project_name, node_name, evm_cids, update: bool = False) -> No
         )
 
         if update or not exists:
+            bootnode_enode.cache_clear()
             # Reth requires that the private key is given in a file with no new line
-            with open(secret_file, "w") as f:
-                print(sk.serialize(), file=f, end="")
-            with open(pk_file, "w") as f:
-                print(pk.hex(), file=f)
-            with open(enode_file, "w") as f:
-                print(f"enode://{pk.hex()}@{node_name}-evm-{cid}:{30303 + cid}", file=f)
+            write_if_changed(secret_file, sk.serialize())
+            write_if_changed(pk_file, f"{pk.hex()}\n")
+            write_if_changed(
+                enode_file, f"enode://{pk.hex()}@{node_name}-evm-{cid}:{30303 + cid}\n"
+            )
+        else:
+            for file in [secret_file, pk_file, enode_file]:
+                keep_file(file)
+
+
+# The enode of the EVM bootnode of a chain. Enodes are read once per project
+# and chain.
+#
+@functools.cache
+def bootnode_enode(project_name: str, cid: int) -> str:
+    bdir = config_dir(project_name, bootnode_name)
+    if not os.path.isdir(bdir):
+        raise RuntimeError("Bootnode config directory not found.")
+    with open(f"{bdir}/evm-{cid}-enode", "r") as f:
+        return f.read().strip()
 
 
 # ############################################################################# #
@@ -282,9 +353,9 @@ def nginx_index_html(project_name, node_name, evm_cids, port=1848):
     dir = config_dir(project_name, node_name)
     os.makedirs(dir, exist_ok=True)
 
-    with open(f"{dir}/index.html", "w") as f:
-        f.write(
-            f"""
+    write_if_changed(
+        f"{dir}/index.html",
+        f"""
 <script src="https://cdn.jsdelivr.net/npm/@webcomponents/webcomponentsjs@2/webcomponents-loader.min.js"></script>
 <script type="module" src="https://cdn.jsdelivr.net/gh/zerodevx/zero-md@1/src/zero-md.min.js"></script>
 <zero-md>
@@ -379,8 +450,8 @@ def nginx_index_html(project_name, node_name, evm_cids, port=1848):
 ```
 </script>
 </zero-md>
-    """
-        )
+    """,
+    )
 
 
 # All endpoints for Kadena
@@ -396,9 +467,9 @@ def nginx_proxy_config(project_name, node_name, evm_cids, mining):
     dir = config_dir(project_name, node_name)
     os.makedirs(dir, exist_ok=True)
 
-    with open(f"{dir}/nginx.conf", "w") as f:
-        f.write(
-            f"""
+    write_if_changed(
+        f"{dir}/nginx.conf",
+        f"""
 worker_processes 1;
 
 events {{
@@ -476,8 +547,8 @@ http {{
             }
     }}
 }}
-"""
-        )
+""",
+    )
 
 
 # #############################################################################
@@ -496,6 +567,161 @@ http {{
 # #############################################################################
 
 
+# ############################################################################# #
+# Resource Profiles
+#
+# A resource profile assigns CPU cores and memory (in MiB) to the consensus
+# service and to each EVM service of a node. The services get matching docker
+# resource limits, a set of pinned cores, GHC RTS settings, and EVM cache and
+# thread settings. Pinned cores are handed out round robin over the cores of
+# the host, so that the services of many nodes are spread evenly.
+#
+# The "small", "medium" and "large" profiles are predefined. A "custom" profile
+# is given as a mapping in the topology file, e.g.:
+#
+# resource_profile:
+#   consensus: {cpus: 3, memory: 3072}
+#   evm: {cpus: 1, memory: 1536}
+
+
+class ServiceResources(TypedDict):
+    cpus: int
+    memory: int
+
+
+class ResourceProfile(TypedDict):
+    consensus: ServiceResources
+    evm: ServiceResources
+
+
+RESOURCE_PROFILES: dict[str, ResourceProfile] = {
+    "small": {
+        "consensus": {"cpus": 1, "memory": 1024},
+        "evm": {"cpus": 1, "memory": 512},
+    },
+    "medium": {
+        "consensus": {"cpus": 2, "memory": 2048},
+        "evm": {"cpus": 1, "memory": 1024},
+    },
+    "large": {
+        "consensus": {"cpus": 4, "memory": 4096},
+        "evm": {"cpus": 2, "memory": 2048},
+    },
+}
+
+
+def resource_profile(profile: str | ResourceProfile) -> ResourceProfile:
+    if isinstance(profile, dict):
+        return profile
+    if profile not in RESOURCE_PROFILES:
+        raise ValueError(
+            f"Unknown resource profile {profile}, expected one of {list(RESOURCE_PROFILES)} or a mapping"
+        )
+    return RESOURCE_PROFILES[profile]
+
+
+def host_memory() -> int | None:
+    "Physical memory of the host in MiB"
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+# Smallest memory limits in MiB with which the services still work
+MIN_SERVICE_MEMORY: dict[str, int] = {"consensus": 512, "evm": 256}
+
+
+# Scale the profiles of nodes to the host. Each node is given as its profile
+# and its number of EVM chains. CPU counts are capped at the number of host
+# cores. If all services together need more memory than the host has, after
+# reserving 10% and at least 1 GiB for the host, the memory of all services is
+# reduced proportionally. Raises ValueError if that takes any service below
+# MIN_SERVICE_MEMORY.
+#
+def fit_profiles(
+    nodes: list[tuple[ResourceProfile, int]],
+    *,
+    cores: int | None = None,
+    memory: int | None = None,
+) -> list[ResourceProfile]:
+    """
+    >>> small = RESOURCE_PROFILES["small"]
+    >>> fit_profiles([(small, 1)], cores=2, memory=2048)
+    [{'consensus': {'cpus': 1, 'memory': 682}, 'evm': {'cpus': 1, 'memory': 341}}]
+    >>> fit_profiles([(small, 5)] * 4, cores=2, memory=4096)
+    Traceback (most recent call last):
+    ...
+    ValueError: The nodes need 14336 MiB of memory, but the host has 4096 MiB of which 3072 MiB are usable. Scaled to the host, the consensus services would get 219 MiB, less than the minimum of 512 MiB. Use fewer nodes or EVM chains, or a smaller resource profile.
+    """
+    cores = cores or os.cpu_count() or 1
+    memory = memory or host_memory()
+    total = sum(p["consensus"]["memory"] + n * p["evm"]["memory"] for p, n in nodes)
+    scale = 1.0
+    if memory is not None and total > 0:
+        usable = max(memory - max(1024, memory // 10), memory // 2)
+        scale = min(1.0, usable / total)
+
+    def fit(service: str, r: ServiceResources) -> ServiceResources:
+        scaled = int(r["memory"] * scale)
+        if scaled < min(r["memory"], MIN_SERVICE_MEMORY[service]):
+            raise ValueError(
+                f"The nodes need {total} MiB of memory, but the host has {memory} MiB"
+                f" of which {usable} MiB are usable. Scaled to the host, the {service}"
+                f" services would get {scaled} MiB, less than the minimum of"
+                f" {MIN_SERVICE_MEMORY[service]} MiB. Use fewer nodes or EVM chains,"
+                f" or a smaller resource profile."
+            )
+        return {"cpus": max(1, min(r["cpus"], cores)), "memory": scaled}
+
+    return [
+        {"consensus": fit("consensus", p["consensus"]), "evm": fit("evm", p["evm"])}
+        for p, _ in nodes
+    ]
+
+
+# Hands out sets of consecutive cores of the host for pinning services. The
+# cores wrap around when all cores are taken.
+#
+class CoreAllocator:
+    def __init__(self, cores: int | None = None):
+        self.cores = cores or os.cpu_count() or 1
+        self.next = 0
+
+    def cpuset(self, cpus: int) -> str:
+        result = [(self.next + i) % self.cores for i in range(min(cpus, self.cores))]
+        self.next = (self.next + len(result)) % self.cores
+        return ",".join(str(c) for c in sorted(result))
+
+
+# GHC runtime settings of chainweb-node. The allocation area (-A) is allocated
+# per capability (-N) and the suggested heap size (-H) is a bit more than a
+# third of the memory limit.
+#
+def rts_flags(resources: ServiceResources | None) -> list[str]:
+    if resources is None:
+        return ["-T", "-H400M", "-A64M"]
+    cpus = resources["cpus"]
+    memory = resources["memory"]
+    allocation_area = min(64, max(4, memory // (16 * cpus)))
+    return ["-T", f"-N{cpus}", f"-H{memory * 3 // 8}M", f"-A{allocation_area}M"]
+
+
+# Docker resource limits and pinned cores of a service
+#
+def limit_service(
+    service: Service, resources: ServiceResources, cpuset: str | None
+) -> None:
+    service.setdefault("deploy", {})["resources"] = {
+        "limits": {
+            "cpus": str(resources["cpus"]),
+            "memory": f"{resources['memory']}M",
+        }
+    }
+    if cpuset is not None:
+        service["cpuset"] = cpuset
+
+
 # ############################################################################# #
 # Nginx Reverse Proxy
 
@@ -567,6 +793,8 @@ def chainweb_consensus_service(
     mining=False,
     exposed=False,
     has_frontend=False,
+    resources: ServiceResources | None = None,
+    cpuset: str | None = None,
 ) -> Service:
     result: Service = {
         "container_name": f"{node_name}-consensus",
@@ -617,9 +845,7 @@ def chainweb_consensus_service(
             "/chainweb/chainweb-node",
             # Runtime Settings
             "+RTS",
-            "-T",
-            "-H400M",
-            "-A64M",
+            *rts_flags(resources),
             "-RTS",
             "--config-file=config/consensus.yaml",
             "--config-file=config/payload-providers.yaml",
@@ -690,6 +916,9 @@ def chainweb_consensus_service(
     if mining:
         result["entrypoint"] += ["--enable-mining-coordination"]
 
+    if resources is not None:
+        limit_service(result, resources, cpuset)
+
     return result
 
 
@@ -747,6 +976,8 @@ def evm_service(
     exposed=False,
     evm_impl: str = "reth",
     use_private_apis: bool = True,
+    resources: ServiceResources | None = None,
+    cpuset: str | None = None,
 ) -> Service:
     # apis:
     default_apis = "eth,net,web3"
@@ -892,6 +1123,22 @@ def evm_service(
     if boot_enodes is not None and len(boot_enodes) > 0:
         result["entrypoint"] += [f"--bootnodes={','.join(boot_enodes)}"]
 
+    # A quarter of the memory is used for caches. Thread pools are sized to the
+    # number of cores.
+    if resources is not None:
+        cache = resources["memory"] // 4
+        threads = str(resources["cpus"])
+        if evm_impl == "reth":
+            result["entrypoint"] += [f"--engine.cross-block-cache-size={cache}"]
+            result["environment"] = {
+                "RAYON_NUM_THREADS": threads,
+                "TOKIO_WORKER_THREADS": threads,
+            }
+        else:
+            result["entrypoint"] += [f"--cache={cache}"]
+            result["environment"] = {"GOMAXPROCS": threads}
+        limit_service(result, resources, cpuset)
+
     return result
 
 
@@ -1020,6 +1267,12 @@ def curl(nodes: list[str]) -> Service:
 # Scan block from block height for receipts:
 # > docker compose run --rm debug -c "source ./functions.sh; list_receipts_from_height 1 90000"
 #
+# Scan receipts of a range of blocks concurrently:
+# > docker compose run --rm debug -c "cd pyrpc && python3 receipts.py http://bootnode-evm-20:8545 0 90000"
+#
+# Index blocks into a local database and query it:
+# > docker compose run --rm debug -c "./headerindex.py ingest && ./headerindex.py details latest"
+#
 def debug(nodes: list[str]) -> Service:
     return {
         "build": {"context": "./debug", "dockerfile": "Dockerfile"},
@@ -1032,12 +1285,7 @@ def debug(nodes: list[str]) -> Service:
             + "}",
             "JWT_SECRET": f"${{JWT_SECRET:-{jwtsecret}}}",
         },
-        "command": [
-            """
-            source ./functions.sh
-            info $$HEIGHT
-            """
-        ],
+        "command": ["./details.py $$HEIGHT"],
         "networks": {f"{n}-internal": None for n in nodes}
         | {
             "p2p": None,
@@ -1083,6 +1331,9 @@ def chainweb_node(
     exposed: bool = False,
     evm_impl: str = "reth",
     minerAddress: str | None = evmMinerAddress,
+    resources: dict[str, str] | None = None,
+    profile: ResourceProfile | None = None,
+    cores: CoreAllocator | None = None,
 ) -> Spec:
     jwtsecret_config(project_name, node_name)
     payload_provider_config(
@@ -1097,11 +1348,17 @@ def chainweb_node(
 
     # EVM bootnodes for each EVM chain:
     def boot_enodes(cid: int) -> list[str]:
-        bdir = config_dir(project_name, "bootnode")
-        if not os.path.isdir(bdir):
-            raise RuntimeError("Bootnode config directory not found.")
-        with open(f"{bdir}/evm-{cid}-enode", "r") as f:
-            return [f.read().strip()]
+        return [bootnode_enode(project_name, cid)]
+
+    # Resources and pinned cores of a service of the node
+    def service_resources(kind: str) -> dict:
+        if profile is None:
+            return {}
+        r = profile[kind]
+        return {
+            "resources": r,
+            "cpuset": cores.cpuset(r["cpus"]) if cores is not None else None,
+        }
 
     result: Spec = {
         "name": f"{node_name}",
@@ -1134,6 +1391,7 @@ def chainweb_node(
                 mining=False if mining_mode is None else True,
                 exposed=exposed,
                 has_frontend=has_frontend,
+                **service_resources("consensus"),
             ),
         }
         | {
@@ -1152,6 +1410,7 @@ def chainweb_node(
                 is_bootnode=is_bootnode,
                 exposed=exposed,
                 evm_impl=evm_impl,
+                **service_resources("evm"),
             )
             for cid in evm_cids
         },
@@ -1210,6 +1469,11 @@ def chainweb_node(
             f"{node_name}-mining-trigger": chainweb_mining_trigger(node_name)
         }
 
+    # Resource limits for all services of the node, e.g. {"cpus": "2", "memory": "4g"}
+    if resources is not None:
+        for s in result["services"].values():
+            s.setdefault("deploy", {})["resources"] = {"limits": dict(resources)}
+
     return result
 
 
@@ -1617,55 +1881,399 @@ def mining_pool_project(update_secrets: bool = False) -> Spec:
     )
 
 
+# ############################################################################# #
+# Generated Topologies
+#
+# A topology lists the nodes of a project. It is generated from parameters or
+# loaded from a YAML or JSON topology file, e.g.:
+#
+# project: scale
+# resource_profile: small
+# nodes:
+#   - name: bootnode
+#     exposed: true
+#   - name: miner-1
+#     mining_mode: simulation
+#     evm_impl: geth
+#     resource_profile: large
+#   - name: node-1
+#     evm_cids: [20, 21]
+#     resources: {cpus: "2", memory: 4g}
+#
+# Unset node fields take the defaults of `chainweb_node`, except for the chains,
+# which default to all EVM and Pact chains. The node with name "bootnode" is the
+# bootnode of the project. It must have all EVM chains enabled.
+#
+# The resource profile of the topology applies to all nodes that do not set
+# their own profile. `resources` sets plain limits for all services of a node
+# and takes precedence over the limits of the profile.
+
+
+class TopologyNode(TypedDict, total=False):
+    name: str
+    evm_cids: list[int]
+    pact_cids: list[int]
+    mining_mode: str | None
+    has_frontend: bool
+    exposed: bool
+    evm_impl: str
+    minerAddress: str | None
+    resources: dict[str, str]
+    resource_profile: str | ResourceProfile
+
+
+class Topology(TypedDict):
+    project: str
+    nodes: list[TopologyNode]
+    resource_profile: NotRequired[str | ResourceProfile]
+
+
+DEFAULT_TOPOLOGY_PROJECT = "topology"
+
+
+def available_evm_cids() -> list[int]:
+    return [
+        cid
+        for cid in range(20, 25)
+        if os.path.exists(f"chain-specs/chain-spec-{cid}.json")
+    ]
+
+
+# A topology with a bootnode, `miners` mining nodes and non-mining nodes up to
+# a total of `nodes` nodes. The bootnode and the mining nodes run all EVM
+# chains. The other nodes run the first `evm_chains` EVM chains.
+#
+def generate_topology(
+    nodes: int,
+    *,
+    miners: int = 1,
+    evm_chains: int = 5,
+    evm_impl: str = EVM_IMPL,
+    resources: dict[str, str] | None = None,
+    profile: str | ResourceProfile | None = None,
+    project: str = DEFAULT_TOPOLOGY_PROJECT,
+) -> Topology:
+    if miners >= nodes:
+        raise ValueError(
+            f"The number of miners must be smaller than the number of nodes, got {miners} miners for {nodes} nodes"
+        )
+
+    all_evm_cids = available_evm_cids()
+
+    def node(name: str, evm_cids: list[int], **kwargs) -> TopologyNode:
+        result = TopologyNode(
+            name=name,
+            evm_cids=evm_cids,
+            evm_impl=evm_impl,
+            **kwargs,
+        )
+        if resources is not None:
+            result["resources"] = resources
+        return result
+
+    result: Topology = {
+        "project": project,
+        "nodes": [node(bootnode_name, all_evm_cids, exposed=True)]
+        + [
+            node(f"miner-{i}", all_evm_cids, mining_mode="simulation")
+            for i in range(1, miners + 1)
+        ]
+        + [
+            node(f"node-{i}", all_evm_cids[:evm_chains])
+            for i in range(1, nodes - miners)
+        ],
+    }
+    if profile is not None:
+        result["resource_profile"] = profile
+    return result
+
+
+def load_topology(file: str) -> Topology:
+    with open(file, "r") as f:
+        topology = yaml.safe_load(f)
+    if not isinstance(topology, dict) or not topology.get("nodes"):
+        raise ValueError(f"Topology file {file} does not define any nodes")
+    topology.setdefault("project", DEFAULT_TOPOLOGY_PROJECT)
+    return topology
+
+
+def validate_topology(topology: Topology) -> None:
+    names = [n["name"] for n in topology["nodes"]]
+    if len(set(names)) != len(names):
+        raise ValueError("Node names in the topology are not unique")
+    if bootnode_name not in names:
+        raise ValueError(
+            f"The topology does not include a node with name {bootnode_name}"
+        )
+    evm_cids = available_evm_cids()
+    for n in topology["nodes"]:
+        missing = set(n.get("evm_cids", evm_cids)) - set(evm_cids)
+        if missing:
+            raise ValueError(
+                f"No chain specs for EVM chains {sorted(missing)} of node {n['name']}"
+            )
+        if n["name"] == bootnode_name and set(n.get("evm_cids", evm_cids)) != set(
+            evm_cids
+        ):
+            raise ValueError("The bootnode must have all EVM chains enabled")
+
+
+def topology_project(topology: Topology, update_secrets: bool = False) -> Spec:
+    validate_topology(topology)
+    project = topology["project"]
+    evm_cids = available_evm_cids()
+    pact_cids = list(range(0, 20))
+    nodes = [n["name"] for n in topology["nodes"]]
+
+    # Create bootstrap node IDs
+    evm_bootnodes(project, bootnode_name, evm_cids, update=update_secrets)
+
+    # Resource profiles of the nodes, scaled to the host
+    default_profile = topology.get("resource_profile")
+    profiles: list[ResourceProfile | None] = [None] * len(nodes)
+    with_profile = [
+        (i, resource_profile(p))
+        for i, n in enumerate(topology["nodes"])
+        if (p := n.get("resource_profile", default_profile)) is not None
+    ]
+    fitted = fit_profiles(
+        [
+            (p, len(topology["nodes"][i].get("evm_cids", evm_cids)))
+            for i, p in with_profile
+        ]
+    )
+    for (i, _), p in zip(with_profile, fitted):
+        profiles[i] = p
+    cores = CoreAllocator()
+
+    top: Spec = spec
+    top["name"] = "chainweb-evm"
+    top["networks"] = {"p2p": None}
+
+    return join_specs(
+        [top]
+        + [
+            chainweb_node(
+                project,
+                n["name"],
+                n.get("evm_cids", evm_cids),
+                n.get("pact_cids", pact_cids),
+                is_bootnode=n["name"] == bootnode_name,
+                mining_mode=n.get("mining_mode"),
+                exposed=n.get("exposed", False),
+                has_frontend=n.get("has_frontend", False),
+                evm_impl=n.get("evm_impl", EVM_IMPL),
+                minerAddress=n.get("minerAddress", evmMinerAddress),
+                resources=n.get("resources"),
+                profile=profile,
+                cores=cores,
+            )
+            for n, profile in zip(topology["nodes"], profiles)
+        ]
+        + [other_services(nodes)]
+    )
+
+
+# #############################################################################
+# Rendered Spec Cache
+#
+# The rendered docker compose spec of a project is cached together with the
+# content hashes of the files that were generated for it. The cache is keyed by
+# the project inputs, which include the source of this script. A cached spec is
+# used only if all generated files still exist with the recorded content.
+
+CACHE_DIR = "./config/.cache"
+
+
+def cache_key(inputs: dict) -> str:
+    with open(__file__, "rb") as f:
+        source = content_hash(f.read())
+    return content_hash(
+        json.dumps(inputs | {"source": source}, sort_keys=True).encode("utf-8")
+    )
+
+
+def cached_spec(name: str, key: str) -> str | None:
+    try:
+        with open(f"{CACHE_DIR}/{name}.json", "r") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if entry.get("key") != key:
+        return None
+    if any(file_hash(file) != h for file, h in entry["files"].items()):
+        return None
+    return entry["spec"]
+
+
+def cache_spec(name: str, key: str, rendered: str) -> None:
+    entry = {"key": key, "files": dict(generated_files), "spec": rendered}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_if_changed(f"{CACHE_DIR}/{name}.json", json.dumps(entry, indent=2))
+
+
 # #############################################################################
 # main
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--exposed-chains")
-parser.add_argument("--project")
-parser.add_argument(
-    "--update-secrets", action="store_true", help="Update existing secrets"
-)
-args = parser.parse_args()
-
-# All available EVM chains
-if args.exposed_chains is None:
-    exposed_evm_chains = list(range(20, 25))
-    exposed_pact_chains = list(range(0, 20))
-else:
-    exposed_cids = list(map(int, args.exposed_chains.split(",")))
-    exposed_evm_chains = [i for i in range(20, 25) if i in exposed_cids]
-    exposed_pact_chains = [i for i in range(0, 20) if i in exposed_cids]
-
-update_secrets = args.update_secrets
-
-# print the docker-compose file
-match args.project:
-    case "minimal":
-        print(yaml.dump(minimal_project(update_secrets=update_secrets), indent=4))
-    case "kadena-dev":
-        print(yaml.dump(kadena_dev_project(update_secrets=update_secrets), indent=4))
-    case "kadena-dev-singleton-evm":
-        print(
-            yaml.dump(
-                kadena_dev_singleton_evm_project(update_secrets=update_secrets),
-                indent=4,
+
+def project_spec(
+    project: str | None,
+    exposed_evm_chains: list[int],
+    exposed_pact_chains: list[int],
+    update_secrets: bool = False,
+    topology: Topology | None = None,
+) -> Spec:
+    if topology is not None:
+        return topology_project(topology, update_secrets=update_secrets)
+    match project:
+        case "minimal":
+            return minimal_project(update_secrets=update_secrets)
+        case "kadena-dev":
+            return kadena_dev_project(update_secrets=update_secrets)
+        case "kadena-dev-singleton-evm":
+            return kadena_dev_singleton_evm_project(update_secrets=update_secrets)
+        case "appdev":
+            return app_dev_project(
+                exposed_evm_chains,
+                exposed_pact_chains,
+                update_secrets=update_secrets,
             )
-        )
-    case "appdev":
-        print(
-            yaml.dump(
-                app_dev_project(
-                    exposed_evm_chains,
-                    exposed_pact_chains,
-                    update_secrets=update_secrets,
-                ),
-                indent=4,
+        case "pact":
+            return pact_project(update_secrets=update_secrets)
+        case "mining-pool":
+            return mining_pool_project(update_secrets=update_secrets)
+        case _:
+            return default_project(update_secrets=update_secrets)
+
+
+# Renders the docker compose spec of a project. Unless secrets are updated or
+# `use_cache` is False, a cached spec is returned if the inputs and generated
+# files did not change.
+#
+def render_project(
+    project: str | None,
+    exposed_evm_chains: list[int],
+    exposed_pact_chains: list[int],
+    update_secrets: bool = False,
+    use_cache: bool = True,
+    topology: Topology | None = None,
+) -> str:
+    name = topology["project"] if topology is not None else project or "default"
+    key = cache_key(
+        {
+            "project": name,
+            "exposed_evm_chains": exposed_evm_chains,
+            "exposed_pact_chains": exposed_pact_chains,
+            "topology": topology,
+            "host": [os.cpu_count(), host_memory()],
+        }
+    )
+    if use_cache and not update_secrets:
+        rendered = cached_spec(name, key)
+        if rendered is not None:
+            return rendered
+
+    generated_files.clear()
+    rendered = yaml.dump(
+        project_spec(
+            project,
+            exposed_evm_chains,
+            exposed_pact_chains,
+            update_secrets=update_secrets,
+            topology=topology,
+        ),
+        Dumper=YamlDumper,
+        indent=4,
+    )
+    cache_spec(name, key, rendered)
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exposed-chains")
+    parser.add_argument("--project")
+    parser.add_argument(
+        "--update-secrets", action="store_true", help="Update existing secrets"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Render the project even if a cached spec is up to date",
+    )
+    parser.add_argument(
+        "--topology",
+        metavar="FILE",
+        help="Render the nodes of a YAML or JSON topology file",
+    )
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        help="Render a generated topology with NODES nodes, including the bootnode",
+    )
+    parser.add_argument(
+        "--miners", type=int, default=1, help="Number of mining nodes of --nodes"
+    )
+    parser.add_argument(
+        "--evm-chains",
+        type=int,
+        default=5,
+        help="Number of EVM chains of the non-mining nodes of --nodes",
+    )
+    parser.add_argument("--evm-impl", choices=["reth", "geth"], default=EVM_IMPL)
+    parser.add_argument("--cpus", help="CPU limit of each service of --nodes")
+    parser.add_argument("--memory", help="Memory limit of each service of --nodes")
+    parser.add_argument(
+        "--profile",
+        choices=list(RESOURCE_PROFILES),
+        help="Resource profile of the nodes of --nodes or --topology",
+    )
+    args = parser.parse_args()
+
+    # All available EVM chains
+    if args.exposed_chains is None:
+        exposed_evm_chains = list(range(20, 25))
+        exposed_pact_chains = list(range(0, 20))
+    else:
+        exposed_cids = list(map(int, args.exposed_chains.split(",")))
+        exposed_evm_chains = [i for i in range(20, 25) if i in exposed_cids]
+        exposed_pact_chains = [i for i in range(0, 20) if i in exposed_cids]
+
+    # Invalid topologies and topologies that do not fit the host are reported
+    # as usage errors
+    try:
+        if args.topology is not None:
+            topology = load_topology(args.topology)
+            if args.profile is not None:
+                topology["resource_profile"] = args.profile
+        elif args.nodes is not None:
+            resources = {}
+            if args.cpus is not None:
+                resources["cpus"] = args.cpus
+            if args.memory is not None:
+                resources["memory"] = args.memory
+            topology = generate_topology(
+                args.nodes,
+                miners=args.miners,
+                evm_chains=args.evm_chains,
+                evm_impl=args.evm_impl,
+                resources=resources or None,
+                profile=args.profile,
+                project=args.project or DEFAULT_TOPOLOGY_PROJECT,
             )
+        else:
+            topology = None
+
+        spec = render_project(
+            args.project,
+            exposed_evm_chains,
+            exposed_pact_chains,
+            update_secrets=args.update_secrets,
+            use_cache=not args.no_cache,
+            topology=topology,
         )
-    case "pact":
-        print(yaml.dump(pact_project(update_secrets=update_secrets), indent=4))
-    case "mining-pool":
-        print(yaml.dump(mining_pool_project(update_secrets=update_secrets), indent=4))
-    case _:
-        print(yaml.dump(default_project(update_secrets=update_secrets), indent=4))
+    except ValueError as e:
+        parser.error(str(e))
+
+    # print the docker-compose file
+    print(spec)
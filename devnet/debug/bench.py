@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+# Benchmarks of the RPC clients and of cuts.py against mock nodes.
+#
+# Each benchmark is run for a number of rounds and reports calls per second,
+# p50 and p99 latency of a round, and the peak memory that is allocated during
+# a round. Memory is traced in a separate round, because tracing slows down
+# allocations. The mock nodes from mocknode.py run in a background thread of
+# the same process, so the numbers include the time of the server.
+#
+# Usage:
+#
+# > ./bench.py
+# > ./bench.py --latency 0.002 --jitter 0.001 --error-rate 0.01 --rounds 50
+
+from dataclasses import dataclass
+from statistics import quantiles
+from typing import Callable
+import aiohttp
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import cuts
+import mocknode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pyrpc"))
+
+import rpc
+from engine_api import EngineRPC
+from execution_api import AsyncEthRPC, EthRPC
+from receipts import ReceiptScanner
+
+# ############################################################################ #
+# Harness
+
+
+@dataclass
+class Result:
+    name: str
+    calls: int
+    seconds: list[float]
+    peak_memory: int
+
+    @property
+    def calls_per_second(self) -> float:
+        return self.calls * len(self.seconds) / sum(self.seconds)
+
+    def row(self) -> str:
+        p50, p99 = percentiles(self.seconds)
+        return (
+            f"{self.name:<32} {self.calls_per_second:>10.0f} {p50 * 1000:>9.2f}"
+            f" {p99 * 1000:>9.2f} {self.peak_memory / 1024:>10.0f}"
+        )
+
+
+def percentiles(xs: list[float]) -> tuple[float, float]:
+    if len(xs) < 2:
+        return xs[0], xs[0]
+    qs = quantiles(xs, n=100, method="inclusive")
+    return qs[49], qs[98]
+
+
+HEADER = f"{'benchmark':<32} {'calls/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10}"
+
+
+def bench(name: str, calls: int, f: Callable[[], None], rounds: int) -> Result:
+    """Run `f`, which makes `calls` calls, for the given number of rounds"""
+    f()  # warm up connections and caches
+    seconds = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        f()
+        seconds.append(time.perf_counter() - t)
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return Result(name, calls, seconds, peak)
+
+
+# Runs the mock nodes in an event loop in a background thread
+#
+class MockServer:
+    def __init__(self, config: mocknode.MockConfig, port: int, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(
+            mocknode.serve(config, port=port, **kwargs), self.loop
+        ).result()
+
+
+# ############################################################################ #
+# Benchmarks
+
+
+def run_benchmarks(
+    config: mocknode.MockConfig,
+    *,
+    port: int = 19480,
+    nodes: int = 4,
+    chains: int = 20,
+    height: int = 2000,
+    rounds: int = 20,
+):
+    MockServer(config, port, nodes=nodes, chains=chains, height=height, fork_depth=5)
+    url = f"http://127.0.0.1:{port}/"
+    node_names = frozenset(f"127.0.0.1:{port + i}" for i in range(nodes))
+
+    eth = EthRPC(url, policies={m: rpc.CallPolicy(retries=0) for m in rpc.METHOD_POLICIES})
+    engine = EngineRPC(url, "00" * 32)
+
+    # with error injection, failed rounds are timed like successful ones
+    def safe(f):
+        def run():
+            try:
+                f()
+            except (rpc.RpcException, ValueError):
+                pass
+        return run
+
+    def async_blocks():
+        async def run():
+            client = AsyncEthRPC(url)
+            await asyncio.gather(
+                *[client.eth_getBlockByNumber(n) for n in range(100)], return_exceptions=True
+            )
+            await rpc.close_async_pool()
+        asyncio.run(run())
+
+    def fork_points():
+        asyncio.run(cuts.get_fork_points(node_names, limit=1000, page_size=250))
+
+    def summary_cuts():
+        async def run():
+            async with aiohttp.ClientSession() as session:
+                await cuts.cuts(session, node_names)
+        asyncio.run(run())
+
+    benchmarks = [
+        ("EthRPC.eth_blockNumber", 1, safe(eth.eth_blockNumber)),
+        ("EthRPC.get_blocks_by_number", 100, safe(lambda: eth.get_blocks_by_number(list(range(100))))),
+        ("EthRPC.eth_getLogs", 1, safe(lambda: eth.eth_getLogs({"fromBlock": "0x0", "toBlock": "0x63"}))),
+        ("EngineRPC.eth_getBlockByNumber", 1, safe(lambda: engine.eth_getBlockByNumber("latest"))),
+        ("AsyncEthRPC.eth_getBlockByNumber", 100, async_blocks),
+        ("ReceiptScanner.scan", 1000, safe(lambda: [c for c in ReceiptScanner(url).scan(0, 999)])),
+        ("cuts.cuts", nodes, safe(summary_cuts)),
+        ("cuts.get_fork_points", nodes * chains, safe(fork_points)),
+    ]
+
+    print(HEADER)
+    for name, calls, f in benchmarks:
+        print(bench(name, calls, f, rounds).row(), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=19480)
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--chains", type=int, default=20)
+    parser.add_argument("--height", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = mocknode.MockConfig(args.latency, args.jitter, args.error_rate)
+    run_benchmarks(
+        config,
+        port=args.port,
+        nodes=args.nodes,
+        chains=args.chains,
+        height=args.height,
+        rounds=args.rounds,
+    )
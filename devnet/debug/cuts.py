@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 
 import os
-from dataclasses import dataclass, field
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from statistics import mean, median
-from typing import NewType
+from typing import AsyncIterator, Iterable, Iterator, NewType
 import aiohttp
 import argparse
 import asyncio
 import base64
 import json
+import random
 import subprocess
+import sys
+import time
 
 DEFAULT_LIMIT = 30
 
@@ -35,10 +40,9 @@ class Hashed(bytes):
         if isinstance(value, bytes):
             if len(value) != 32:
                 raise ValueError(f"Hashed values must be 32 bytes, got {len(value)}")
-            else:
-                value = bytes(value)
         else:
             raise TypeError(f"Hashed values must be bytes, got {type(value)}")
+        return super().__new__(cls, value)
 
     def __str__(self):
         return b64e(self)
@@ -47,6 +51,139 @@ class Hashed(bytes):
         return f"Hashed({self})"
 
 
+HASH_SIZE = 32
+
+
+# A sequence of hashes that are packed into a single buffer of 32 bytes per
+# hash. Items are materialized as Hashed values only when they are accessed.
+#
+class HashArray:
+    __slots__ = ("_buf",)
+
+    def __init__(self, hashes: Iterable[str | bytes] = ()):
+        self._buf = bytearray()
+        self.extend(hashes)
+
+    @classmethod
+    def from_buffer(cls, buf: bytes | bytearray) -> "HashArray":
+        if len(buf) % HASH_SIZE != 0:
+            raise ValueError(f"Buffer size must be a multiple of {HASH_SIZE}, got {len(buf)}")
+        a = cls()
+        a._buf = bytearray(buf)
+        return a
+
+    def append(self, h: str | bytes):
+        self._buf += Hashed(h)
+
+    def extend(self, hashes: Iterable[str | bytes]):
+        for h in hashes:
+            self.append(h)
+
+    def __len__(self) -> int:
+        return len(self._buf) // HASH_SIZE
+
+    def __getitem__(self, i: int | slice):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("HashArray slices must be contiguous")
+            return HashArray.from_buffer(
+                memoryview(self._buf)[start * HASH_SIZE : max(start, stop) * HASH_SIZE]
+            )
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("HashArray index out of range")
+        return Hashed(bytes(memoryview(self._buf)[i * HASH_SIZE : (i + 1) * HASH_SIZE]))
+
+    def __iter__(self) -> Iterator[Hashed]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def tobytes(self) -> bytes:
+        "A copy of the packed hashes. Slices of it are unvalidated raw hashes."
+        return bytes(self._buf)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HashArray):
+            return self._buf == other._buf
+        return NotImplemented
+
+    def __add__(self, other: "HashArray") -> "HashArray":
+        return HashArray.from_buffer(self._buf + other._buf)
+
+    @classmethod
+    def concat(cls, arrays: Iterable["HashArray"]) -> "HashArray":
+        return cls.from_buffer(b"".join(a._buf for a in arrays))
+
+    def __repr__(self):
+        return f"HashArray({[str(h) for h in self]})"
+
+
+# A branch of consecutive blocks in order of decreasing height, starting at
+# block height `top`. It behaves like a list of ranked block hashes and
+# supports lookup by block height in O(1).
+#
+class RankedHashes:
+    __slots__ = ("top", "hashes")
+
+    def __init__(self, top: int, hashes: HashArray):
+        self.top = top
+        self.hashes = hashes
+
+    @property
+    def bottom(self) -> int:
+        "The lowest block height of the branch. Larger than top if empty."
+        return self.top - len(self.hashes) + 1
+
+    def get(self, height: int) -> "Hashed | None":
+        i = self.top - height
+        if 0 <= i < len(self.hashes):
+            return self.hashes[i]
+        return None
+
+    def below(self, height: int) -> "RankedHashes":
+        "The part of the branch at or below the given height"
+        i = max(0, self.top - height)
+        return RankedHashes(min(self.top, height), self.hashes[i:])
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __getitem__(self, i: int | slice):
+        if isinstance(i, slice):
+            start, _, _ = i.indices(len(self))
+            return RankedHashes(self.top - start, self.hashes[i])
+        if i < 0:
+            i += len(self)
+        return (self.top - i, self.hashes[i])
+
+    def __iter__(self) -> Iterator[tuple[int, Hashed]]:
+        for i, h in enumerate(self.hashes):
+            yield (self.top - i, h)
+
+    def __add__(self, other: "RankedHashes") -> "RankedHashes":
+        "Extend the branch with a branch that continues below it"
+        if len(self) == 0:
+            return other
+        if len(other) == 0:
+            return self
+        if other.top != self.bottom - 1:
+            raise ValueError(f"Branches are not consecutive: {self.bottom} and {other.top}")
+        return RankedHashes(self.top, self.hashes + other.hashes)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RankedHashes):
+            return (len(self) == 0 and len(other) == 0) or (
+                self.top == other.top and self.hashes == other.hashes
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RankedHashes({self.top}, {self.hashes})"
+
+
 # ############################################################################ #
 
 CutId = NewType("CutId", Hashed)
@@ -57,6 +194,9 @@ BlockHeight = int
 RankedBlockHash = tuple[BlockHeight, BlockHash]
 CutHeight = int
 
+# Blocks of a branch in order of decreasing height
+Branch = RankedHashes | list[RankedBlockHash]
+
 # Assigns set of nodes to ranked block hashes
 Forks = list[dict[RankedBlockHash, frozenset[Node]]]
 
@@ -84,6 +224,85 @@ class Cut:
     origin: str | None = field(default=None, compare=False)
 
 
+# ############################################################################ #
+# Request Limits
+
+DEFAULT_MAX_REQUESTS = 32
+DEFAULT_MAX_REQUESTS_PER_NODE = 8
+DEFAULT_RETRIES = 3
+
+
+# Bounds the number of concurrent requests overall and per node, and retries
+# requests that time out with exponential backoff.
+#
+class Limiter:
+    def __init__(
+        self,
+        max_requests: int = DEFAULT_MAX_REQUESTS,
+        max_requests_per_node: int = DEFAULT_MAX_REQUESTS_PER_NODE,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = 0.25,
+    ):
+        self.max_requests = max_requests
+        self.max_requests_per_node = max_requests_per_node
+        self.retries = retries
+        self.backoff = backoff
+        self._all = asyncio.Semaphore(max_requests)
+        self._nodes: dict[Node, asyncio.Semaphore] = {}
+
+    def connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit=self.max_requests, limit_per_host=self.max_requests_per_node
+        )
+
+    def session(self, timeout: aiohttp.ClientTimeout) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(timeout=timeout, connector=self.connector())
+
+    @asynccontextmanager
+    async def slot(self, node: Node):
+        if node not in self._nodes:
+            self._nodes[node] = asyncio.Semaphore(self.max_requests_per_node)
+        async with self._nodes[node], self._all:
+            yield
+
+    def delay(self, attempt: int) -> float:
+        return self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+
+
+# Make a request and return the decoded JSON body. If a limiter is given, the
+# request waits for a free slot and is retried when it times out.
+#
+async def fetch_json(
+    session: aiohttp.ClientSession,
+    node: Node,
+    method: str,
+    uri: str,
+    *,
+    limiter: Limiter | None = None,
+    **kwargs,
+):
+    attempts = 1 if limiter is None else limiter.retries + 1
+    for attempt in range(attempts):
+        try:
+            if limiter is None:
+                async with session.request(method, uri, **kwargs) as resp:
+                    if resp.status != 200:
+                        raise ValueError(f"Error: {resp.status} {resp}")
+                    return await resp.json()
+            else:
+                async with limiter.slot(node):
+                    async with session.request(method, uri, **kwargs) as resp:
+                        if resp.status != 200:
+                            raise ValueError(f"Error: {resp.status} {resp}")
+                        return await resp.json()
+        except asyncio.TimeoutError:
+            if limiter is None or attempt + 1 == attempts:
+                raise
+            delay = limiter.delay(attempt)
+            print(f"Request to {uri} timed out, retrying in {delay:.2f}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+
+
 # ############################################################################ #
 # CHAINWEB API
 
@@ -94,33 +313,35 @@ async def get_cut(
     session: aiohttp.ClientSession,
     node: Node,
     *,
+    maxheight: CutHeight | None = None,
+    limiter: Limiter | None = None,
     version="evm-development"
 ) -> Cut|None:
     """
-    Get the latest cut from the given node.
+    Get the latest cut from the given node, or the latest cut that is not
+    higher than maxheight.
     Returns None if the node is not reachable.
     """
     uri = f"http://{node}/chainweb/0.0/{version}/cut"
+    params = {} if maxheight is None else {"maxheight": maxheight}
     try:
-        async with session.get(uri) as resp:
-            json = await resp.json()
-            if resp.status != 200:
-                raise ValueError(f"Error: {resp.status} {resp}")
-            return Cut(
-                hashes={
-                    # decode block height and block hash from base64 url
-                    int(k): (v["height"], BlockHash(v["hash"]))
-                    for k, v in json["hashes"].items()
-                },
-                weight=json["weight"],
-                height=json["height"],
-                instance=ChainwebVersion(json["instance"]),
-                id=CutId(json["id"]),
-                origin=json.get("origin"),
-            )
+        json = await fetch_json(session, node, "GET", uri, limiter=limiter, params=params)
+        return Cut(
+            hashes={
+                # decode block height and block hash from base64 url
+                int(k): (v["height"], BlockHash(Hashed(v["hash"])))
+                for k, v in json["hashes"].items()
+            },
+            weight=json["weight"],
+            height=json["height"],
+            instance=ChainwebVersion(json["instance"]),
+            id=CutId(json["id"]),
+            origin=json.get("origin"),
+        )
     except aiohttp.ClientConnectorError as _:
         return None
-    except aiohttp.ConnectionTimeoutError as _:
+    except asyncio.TimeoutError as _:
+        print(f"Failed to get cut from {node}: timeout", file=sys.stderr)
         return None
 
 
@@ -130,33 +351,76 @@ async def get_branch_hashes(
     cid: ChainId,
     branch: BlockHash,
     *,
+    lower: list[BlockHash] | None = None,
     limit: int = DEFAULT_LIMIT,
+    height: BlockHeight | None = None,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
     version="evm-development",
-) -> list[BlockHash]|None:
+) -> HashArray|None:
     """
     Get the branch hashes for the given chain id and branch hash.
+
+    If lower bounds are given, only blocks that are not ancestors of any of the
+    lower bounds are returned.
+
+    If the height of the branch hash and a page size are given, the branch is
+    requested in windows of `page_size` block heights, which are fetched
+    concurrently. Otherwise pages are fetched one after another, following the
+    `next` cursor of each response. Branches with lower bounds are not
+    windowed: they are usually short, and windows below the lower bound would
+    come back empty.
+
     Returns None if the node is not reachable.
     """
     uri = f"http://{node}/chainweb/0.0/{version}/chain/{cid}/hash/branch"
-    result: list[BlockHash] = []
-    next = branch
-    try:
-        while len(result) < limit and next is not None:
+    lower_hashes = [f"{h}" for h in lower or []]
+
+    async def fetch(
+        n: int, minheight: BlockHeight | None = None, maxheight: BlockHeight | None = None
+    ) -> HashArray:
+        result = HashArray()
+        next = branch
+        while len(result) < n and next is not None:
             body = {
                 "upper": [f"{next}"],
-                "lower": [],
+                "lower": lower_hashes,
             }
-            params = {"limit": limit - len(result)}
-            async with session.post(uri, json=body, params=params) as resp:
-                if resp.status != 200:
-                    raise ValueError(f"Error: {resp.status} {resp}")
-                json = await resp.json()
-                result += json["items"]
-                next = json["next"].split(":")[1] if json["next"] else None
+            params = {"limit": n - len(result)}
+            if minheight is not None:
+                params["minheight"] = minheight
+            if maxheight is not None:
+                params["maxheight"] = maxheight
+            json = await fetch_json(
+                session, node, "POST", uri, limiter=limiter, json=body, params=params
+            )
+            result.extend(json["items"])
+            next = json["next"].split(":")[1] if json["next"] else None
         return result
+
+    try:
+        if height is None or page_size is None or limit <= page_size or lower_hashes:
+            return await fetch(limit)
+
+        bottom = max(height - limit + 1, 0)
+        windows = [
+            (max(top - page_size + 1, bottom), top)
+            for top in range(height, bottom - 1, -page_size)
+        ]
+        pages = await asyncio.gather(*[fetch(hi - lo + 1, lo, hi) for lo, hi in windows])
+
+        # The branch ends early if it reaches a lower bound or the genesis
+        # block. Lower windows are empty in that case.
+        result: list[HashArray] = []
+        for (lo, hi), page in zip(windows, pages):
+            result.append(page)
+            if len(page) < hi - lo + 1:
+                break
+        return HashArray.concat(result)
     except aiohttp.ClientConnectorError as _:
         return None
-    except aiohttp.ConnectionTimeoutError as _:
+    except asyncio.TimeoutError as _:
+        print(f"Failed to get branch of chain {cid} from {node}: timeout", file=sys.stderr)
         return None
 
 
@@ -168,10 +432,11 @@ async def get_branch_hashes(
 async def cuts(
     session, 
     nodes: frozenset[Node],
-    version: str = "evm-development"
+    version: str = "evm-development",
+    limiter: Limiter | None = None,
 ) -> dict[Node, Cut|None]:
     async def run(n):
-        c = await get_cut(session, n, version=version)
+        c = await get_cut(session, n, limiter=limiter, version=version)
         return n, c
 
     jobs = [run(n) for n in nodes]
@@ -179,29 +444,42 @@ async def cuts(
     return {key: value for key, value in results}
 
 
+# Assign block heights to the hashes of a branch with the given top height
+#
+def rank_branch(height: BlockHeight, branch: HashArray) -> RankedHashes:
+    return RankedHashes(height, branch)
+
+
 async def get_branches(
     session: aiohttp.ClientSession,
     node: Node,
     *,
     chains: list[ChainId] | None = None,
     limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
     version="evm-development",
-) -> dict[ChainId, list[RankedBlockHash]]|None:
-    cut = await get_cut(session, node, version=version)
+) -> dict[ChainId, Branch]|None:
+    cut = await get_cut(session, node, limiter=limiter, version=version)
     if cut is None:
         return None
     else:
         async def run(cid, h, bh):
             branch = await get_branch_hashes(
-                session, node, cid, bh, limit=limit, version=version
+                session,
+                node,
+                cid,
+                bh,
+                limit=limit,
+                height=h,
+                page_size=page_size,
+                limiter=limiter,
+                version=version,
             )
             if branch is None:
                 return cid, None
             else:
-                l = list(range(h + 1 - len(branch), h + 1))
-                l.reverse()
-                ranked = list(zip(l, branch))
-                return cid, ranked
+                return cid, rank_branch(h, branch)
 
         results = await asyncio.gather(
             *[
@@ -219,11 +497,19 @@ async def get_branches_for_all_nodes(
     *,
     chains: list[ChainId] | None = None,
     limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
     version="evm-development",
-) -> dict[Node, dict[ChainId, list[RankedBlockHash]]]:
+) -> dict[Node, dict[ChainId, Branch]]:
     async def run(n):
         branches = await get_branches(
-            session, n, chains=chains, limit=limit, version=version
+            session,
+            n,
+            chains=chains,
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
+            version=version,
         )
         return n, branches
 
@@ -232,61 +518,340 @@ async def get_branches_for_all_nodes(
     return {key: value for key, value in results if value is not None}
 
 
-# Find forks per chain:
+# Yield the branches of all nodes for one chain at a time, as soon as the
+# branches for that chain are available from all nodes.
 #
-def forks(x: dict[Node, list[RankedBlockHash]]) -> Forks:
-    # reverse the order of blocks to start from lowest height
-    # O(n * m)
-    a = {k: v[::-1] for k, v in x.items()}
+async def iter_branches_for_all_nodes(
+    session: aiohttp.ClientSession,
+    nodes: frozenset[Node],
+    *,
+    chains: list[ChainId] | None = None,
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
+    version="evm-development",
+) -> AsyncIterator[tuple[ChainId, dict[Node, Branch]]]:
+    cs = await cuts(session, nodes, version=version, limiter=limiter)
+    tops: dict[ChainId, dict[Node, tuple[BlockHeight, BlockHash]]] = {}
+    for n, c in cs.items():
+        if c is not None:
+            for cid, top in c.hashes.items():
+                if chains is None or cid in chains:
+                    tops.setdefault(cid, {})[n] = top
+
+    async def run(cid):
+        async def branch(n, h, bh):
+            b = await get_branch_hashes(
+                session,
+                n,
+                cid,
+                bh,
+                limit=limit,
+                height=h,
+                page_size=page_size,
+                limiter=limiter,
+                version=version,
+            )
+            return n, None if b is None else rank_branch(h, b)
+
+        results = await asyncio.gather(
+            *[branch(n, h, bh) for n, (h, bh) in tops[cid].items()]
+        )
+        return cid, {n: b for n, b in results if b is not None}
 
+    for job in asyncio.as_completed([run(cid) for cid in tops]):
+        yield await job
+
+
+# Blocks of a branch that is given as list, indexed by height
+#
+class HeightIndex(dict[BlockHeight, BlockHash]):
+    def __init__(self, branch: list[RankedBlockHash]):
+        super().__init__(branch)
+        self.bottom = min(self) if len(self) > 0 else 0
+        self.top = max(self) if len(self) > 0 else -1
+
+
+# Find forks per chain:
+#
+# Starting at the lowest height for which there are blocks from all nodes,
+# group the nodes at each height by the block hash that they have at that
+# height. Levels are produced one at a time in order of increasing height.
+#
+# O(n * m) for n nodes with branches of length m.
+#
+# Packed branches are compared as raw 32 byte slices of their buffers. Only the
+# hashes of the yielded levels are materialized as Hashed values.
+#
+def iter_forks(
+    x: dict[Node, Branch]
+) -> Iterator[dict[RankedBlockHash, frozenset[Node]]]:
+    # index blocks by height. RankedHashes are already indexed by height.
     # O(n * m)
-    # start with the lowest block for which we have blocks on all nodes
-    max_min_rank = max([v[0][0] for v in a.values() if len(v) > 0])
-    # for node, hashes in a.items():
-    #     if [ h for h, _ in hashes if h == max_min_rank ] == []:
-
-    cur_rank = max_min_rank
-    levels: dict[BlockHeight, dict[Node, BlockHash | None]] = {}
-    done = False
-    while not done:
-        done = True
-        for k, v in a.items():
-            levels[cur_rank] = levels.get(cur_rank, {})
-            if len(v) > 0 and v[0][0] == cur_rank:
-                levels[cur_rank][k] = v[0][1]
-                del a[k][0]
-                done = False
-            else:
-                levels[cur_rank][k] = None
-        cur_rank += 1
+    a = {k: v if isinstance(v, RankedHashes) else HeightIndex(v) for k, v in x.items()}
+    a = {k: v for k, v in a.items() if len(v) > 0}
+    if len(a) == 0:
+        return
 
-    # O(n * m * m)
-    return [
-        {
-            (h, value): frozenset([key for key, val in level.items() if val == value])
-            for value in frozenset(level.values())
-            if value is not None
-        }
-        for h, level in levels.items()
-    ]
+    packed = [(k, v.top, v.hashes.tobytes()) for k, v in a.items() if isinstance(v, RankedHashes)]
+    indexed = [(k, v) for k, v in a.items() if not isinstance(v, RankedHashes)]
 
+    # start with the lowest block for which we have blocks on all nodes
+    max_min_rank = max(v.bottom for v in a.values())
+    max_rank = max(v.top for v in a.values())
 
-def fork_points(a: Forks) -> ForkPoints:
-    r = a.copy()
-    r.reverse()
+    # O(n * m)
+    for h in range(max_min_rank, max_rank + 1):
+        raw_level: dict[bytes, list[Node]] = {}
+        for k, top, raw in packed:
+            o = (top - h) * HASH_SIZE
+            if 0 <= o < len(raw):
+                raw_level.setdefault(raw[o : o + HASH_SIZE], []).append(k)
+        # values of list branches are used as they are
+        level: dict[BlockHash, list[Node]] = {Hashed(bh): ns for bh, ns in raw_level.items()}
+        for k, v in indexed:
+            bh = v.get(h)
+            if bh is not None:
+                level.setdefault(bh, []).append(k)
+        yield {(h, bh): frozenset(ns) for bh, ns in level.items()}
+
+
+def forks(x: dict[Node, Branch]) -> Forks:
+    return list(iter_forks(x))
+
+
+# Levels must be ordered by increasing height, so that the last height that is
+# recorded for a set of nodes is the largest.
+#
+# O(n * m)
+def fork_points(a: Iterable[dict[RankedBlockHash, frozenset[Node]]]) -> ForkPoints:
     fp: dict[frozenset[Node], BlockHeight] = {}
-    for level in r:
+    for level in a:
         for (h, _), ns in level.items():
-            if fp.get(ns) is None:
-                fp[ns] = h
+            fp[ns] = h
     return fp
 
 
 def branches_for_chain(
-    branches: dict[Node, dict[ChainId, list[RankedBlockHash]]],
+    branches: dict[Node, dict[ChainId, Branch]],
     cid: ChainId
-) -> dict[Node, list[RankedBlockHash]]:
-    return {k: v[cid] for k, v in branches.items()}
+) -> dict[Node, Branch]:
+    return {k: v[cid] for k, v in branches.items() if cid in v}
+
+
+# ############################################################################ #
+# Header Updates
+
+HEADER_UPDATES_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=2)
+
+
+# Subscribe to the server-sent events stream of new block headers of a node and
+# yield the decoded header of each event.
+#
+async def header_updates(
+    session: aiohttp.ClientSession,
+    node: Node,
+    *,
+    version="evm-development",
+) -> AsyncIterator[dict]:
+    uri = f"http://{node}/chainweb/0.0/{version}/header/updates"
+    headers = {"accept": "text/event-stream"}
+    async with session.get(uri, headers=headers, timeout=HEADER_UPDATES_TIMEOUT) as resp:
+        if resp.status != 200:
+            raise ValueError(f"Error: {resp.status} {resp}")
+        data: list[str] = []
+        async for line in resp.content:
+            line = line.decode().rstrip("\r\n")
+            if line == "":
+                if data:
+                    yield json.loads("\n".join(data))["header"]
+                data = []
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+
+
+# Update a cut with a new block header. The cut height is kept as the sum of
+# the chain heights. Weight and id are those of the base cut.
+#
+def update_cut(cut: Cut, header: dict) -> Cut:
+    cid = ChainId(header["chainId"])
+    height = BlockHeight(header["height"])
+    old = cut.hashes[cid][0] if cid in cut.hashes else 0
+    hashes = cut.hashes | {cid: (height, BlockHash(Hashed(header["hash"])))}
+    return replace(cut, hashes=hashes, height=CutHeight(cut.height + height - old))
+
+
+# Follow the cuts of all nodes. The current cut of each node is yielded first
+# and then again on each new block header. On errors the cut of the node is
+# fetched again before the stream is resubscribed.
+#
+async def follow_cuts(
+    session: aiohttp.ClientSession,
+    nodes: frozenset[Node],
+    *,
+    reconnect: float = 1.0,
+    limiter: Limiter | None = None,
+    version="evm-development",
+) -> AsyncIterator[tuple[Node, Cut]]:
+    queue: asyncio.Queue[tuple[Node, Cut]] = asyncio.Queue()
+
+    async def run(node):
+        while True:
+            cut = await get_cut(session, node, limiter=limiter, version=version)
+            if cut is not None:
+                await queue.put((node, cut))
+                try:
+                    async for header in header_updates(session, node, version=version):
+                        cut = update_cut(cut, header)
+                        await queue.put((node, cut))
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    print(f"Header updates from {node} failed: {e}", file=sys.stderr)
+            await asyncio.sleep(reconnect)
+
+    tasks = [asyncio.create_task(run(n)) for n in nodes]
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ############################################################################ #
+# Fork Tracker
+
+
+class ForkTracker:
+    """
+    Keeps the branches of all nodes and chains across polls.
+
+    On each poll only the blocks above the previously known top of a branch
+    are requested, by passing the known top as lower bound to the branch
+    query. Forks and fork points are recomputed only for chains whose branches
+    changed.
+    """
+
+    def __init__(
+        self,
+        nodes: frozenset[Node],
+        *,
+        chains: list[ChainId] | None = None,
+        limit: int = DEFAULT_LIMIT,
+        page_size: int | None = None,
+        limiter: Limiter | None = None,
+        version: str = "evm-development",
+    ):
+        self.nodes = nodes
+        self.chains = chains
+        self.limit = limit
+        self.page_size = page_size
+        self.limiter = limiter
+        self.version = version
+        self.branches: dict[Node, dict[ChainId, RankedHashes]] = {}
+        self._forks: dict[ChainId, Forks] = {}
+        self._fork_points: dict[ChainId, ForkPoints] = {}
+
+    async def _update_branch(
+        self,
+        session: aiohttp.ClientSession,
+        node: Node,
+        cid: ChainId,
+        height: BlockHeight,
+        top: BlockHash,
+    ) -> bool:
+        known = self.branches.get(node, {}).get(cid)
+        if known and known[0] == (height, top):
+            return False
+
+        lower = [known[0][1]] if known else []
+        new = await get_branch_hashes(
+            session,
+            node,
+            cid,
+            top,
+            lower=lower,
+            limit=self.limit,
+            height=height,
+            page_size=self.page_size,
+            limiter=self.limiter,
+            version=self.version,
+        )
+        if new is None:
+            return False
+
+        ranked = rank_branch(height, new)
+
+        # If the result is not truncated by the limit, the new blocks connect
+        # to the known branch at the common ancestor right below the lowest
+        # new block.
+        if known and len(new) < self.limit:
+            ancestor = height - len(new)
+            ranked = (ranked + known.below(ancestor))[: self.limit]
+
+        self.branches.setdefault(node, {})[cid] = ranked
+        return True
+
+    async def _poll_node(
+        self, session: aiohttp.ClientSession, node: Node
+    ) -> list[ChainId]:
+        cut = await get_cut(session, node, limiter=self.limiter, version=self.version)
+        if cut is None:
+            return []
+        return await self._update_node(session, node, cut)
+
+    async def _update_node(
+        self, session: aiohttp.ClientSession, node: Node, cut: Cut
+    ) -> list[ChainId]:
+        async def run(cid, h, bh):
+            changed = await self._update_branch(session, node, cid, h, bh)
+            return cid if changed else None
+
+        results = await asyncio.gather(
+            *[
+                run(cid, h, bh)
+                for cid, (h, bh) in cut.hashes.items()
+                if self.chains is None or cid in self.chains
+            ]
+        )
+        return [cid for cid in results if cid is not None]
+
+    async def poll(self, session: aiohttp.ClientSession) -> frozenset[ChainId]:
+        """
+        Update the branches of all nodes. Returns the chains for which a branch
+        changed.
+        """
+        results = await asyncio.gather(*[self._poll_node(session, n) for n in self.nodes])
+        return self._invalidate(frozenset(cid for cids in results for cid in cids))
+
+    async def update(
+        self, session: aiohttp.ClientSession, node: Node, cut: Cut
+    ) -> frozenset[ChainId]:
+        """
+        Update the branches of a node from a known cut. Returns the chains for
+        which a branch changed.
+        """
+        return self._invalidate(frozenset(await self._update_node(session, node, cut)))
+
+    def _invalidate(self, changed: frozenset[ChainId]) -> frozenset[ChainId]:
+        for cid in changed:
+            self._forks.pop(cid, None)
+            self._fork_points.pop(cid, None)
+        return changed
+
+    @property
+    def cids(self) -> frozenset[ChainId]:
+        return frozenset(cid for v in self.branches.values() for cid in v.keys())
+
+    def forks(self, cid: ChainId) -> Forks:
+        if cid not in self._forks:
+            self._forks[cid] = forks(branches_for_chain(self.branches, cid))
+        return self._forks[cid]
+
+    def fork_points(self, cid: ChainId) -> ForkPoints:
+        if cid not in self._fork_points:
+            self._fork_points[cid] = fork_points(self.forks(cid))
+        return self._fork_points[cid]
 
 
 async def get_fork_points(
@@ -294,16 +859,21 @@ async def get_fork_points(
     *,
     chains: list[ChainId] | None = None,
     version: str = "evm-development",
-    limit: int = DEFAULT_LIMIT
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
 ) -> dict[ChainId, ForkPoints]:
+    limiter = limiter or Limiter()
     timeout = aiohttp.ClientTimeout(connect=2, total=4)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with limiter.session(timeout) as session:
         branches = await get_branches_for_all_nodes(
             session,
             nodes,
             chains=chains,
             version=version,
-            limit=limit
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
         )
         cids = frozenset(
             [
@@ -321,16 +891,21 @@ async def get_forks(
     nodes: frozenset[Node], *,
     chains: list[ChainId] | None = None,
     version: str = "evm-development",
-    limit: int = DEFAULT_LIMIT
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
 ) -> dict[ChainId, Forks]:
+    limiter = limiter or Limiter()
     timeout = aiohttp.ClientTimeout(connect=2, total=4)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with limiter.session(timeout) as session:
         branches = await get_branches_for_all_nodes(
             session,
             nodes,
             chains=chains,
             version=version,
-            limit=limit
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
         )
         cids = frozenset(
             [
@@ -368,74 +943,282 @@ def get_docker_project_nodes() -> frozenset[Node]:
 # Summary
 
 
-async def summary(nodes: frozenset[Node], version: str = "evm-development"):
+def cut_info(c: Cut | None) -> dict | None:
+    if c is None:
+        return None
+    else:
+        hs = [h for h, _ in c.hashes.values()]
+        return {
+            "cut.height": c.height,
+            "blockheight.avg": mean(hs),
+            "blockheight.median": median(hs),
+            "blockheight.min": min(hs),
+            "blockheight.max": max(hs),
+        }
+
+
+async def summary(
+    nodes: frozenset[Node],
+    version: str = "evm-development",
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    timeout = aiohttp.ClientTimeout(connect=0.5, total=1)
+    async with limiter.session(timeout) as session:
+        cs = await cuts(session, nodes, version=version, limiter=limiter)
+        print(json.dumps({n: cut_info(cs.get(n)) for n in nodes}))
+
+
+# Print the summary of all nodes each time a node receives a new block header.
+#
+async def follow_summary(
+    nodes: frozenset[Node],
+    version: str = "evm-development",
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    cs: dict[Node, Cut] = {}
+    timeout = aiohttp.ClientTimeout(connect=0.5, total=1)
+    async with limiter.session(timeout) as session:
+        async for n, c in follow_cuts(session, nodes, limiter=limiter, version=version):
+            cs[n] = c
+            print(json.dumps({n: cut_info(cs.get(n)) for n in nodes}), flush=True)
+
+
+DEFAULT_WINDOW = 60
+
+
+# Ring buffers of the last `window` samples of the cut height and of the height
+# of each chain of a node.
+#
+class CutSamples:
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.cut: deque[tuple[float, CutHeight]] = deque(maxlen=window)
+        self.chains: dict[ChainId, deque[tuple[float, BlockHeight]]] = {}
+
+    def add(self, t: float, cut: Cut):
+        self.cut.append((t, cut.height))
+        for cid, (h, _) in cut.hashes.items():
+            if cid not in self.chains:
+                self.chains[cid] = deque(maxlen=self.window)
+            self.chains[cid].append((t, h))
+
+    @staticmethod
+    def rate(samples: deque[tuple[float, int]]) -> float | None:
+        """Growth per second between the first and the last sample"""
+        if len(samples) < 2:
+            return None
+        (t0, h0), (t1, h1) = samples[0], samples[-1]
+        return (h1 - h0) / (t1 - t0) if t1 > t0 else None
+
+    def info(self) -> dict:
+        hs = [s[-1][1] for s in self.chains.values()]
+        rates = [r for s in self.chains.values() if (r := self.rate(s)) is not None]
+        return {
+            "cut.height": self.cut[-1][1],
+            "cut.growth": self.rate(self.cut),
+            "blockheight.min": min(hs),
+            "blockheight.max": max(hs),
+            "blockheight.spread": max(hs) - min(hs),
+            "blockrate": sum(rates) if rates else None,
+            "blockrate.chain.min": min(rates) if rates else None,
+            "blockrate.chain.max": max(rates) if rates else None,
+            "blockrate.chain.spread": max(rates) - min(rates) if rates else None,
+            "samples": len(self.cut),
+        }
+
+
+# Poll the cuts of all nodes every `interval` seconds and print rolling
+# statistics over the last `window` samples as one JSON object per line.
+#
+async def watch_summary(
+    nodes: frozenset[Node],
+    interval: float,
+    version: str = "evm-development",
+    window: int = DEFAULT_WINDOW,
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    samples = {n: CutSamples(window) for n in nodes}
     timeout = aiohttp.ClientTimeout(connect=0.5, total=1)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        cs = await cuts(session, nodes, version=version)
-        def info(n):
-            c = cs.get(n)
-            if c is None:
-                return None
-            elif c is not None:
-                hs = [h for h, _ in c.hashes.values()]
-                return {
-                    "cut.height": c.height,
-                    "blockheight.avg": mean(hs),
-                    "blockheight.median": median(hs),
-                    "blockheight.min": min(hs),
-                    "blockheight.max": max(hs),
-                }
-
-        print(json.dumps({n: info(n) for n in nodes}))
+    async with limiter.session(timeout) as session:
+        while True:
+            t = time.monotonic()
+            cs = await cuts(session, nodes, version=version, limiter=limiter)
+            for n, c in cs.items():
+                if c is not None:
+                    samples[n].add(t, c)
+            r = {
+                n: samples[n].info() if cs.get(n) is not None else None
+                for n in sorted(nodes)
+            }
+            print(json.dumps(r), flush=True)
+            await asyncio.sleep(max(0, interval - (time.monotonic() - t)))
 
 
 # ############################################################################ #
 # Main
 
 
+def forks_json(fs: Forks) -> list:
+    return [
+        [
+            {
+                "height": h,
+                "hash": str(hs),
+                "nodes": list(nodes),
+            }
+            for (h, hs), nodes in level.items()
+        ]
+        for level in fs
+    ]
+
+
+def fork_points_json(fp: ForkPoints) -> list:
+    return [
+        {
+            "nodes": list(nodes),
+            "height": h,
+        }
+        for nodes, h in fp.items()
+    ]
+
+
 async def main(
     nodes: frozenset[Node],
     chains: list[ChainId] | None = None,
     forks: bool = False,
     version: str = "evm-development",
-    limit: int = DEFAULT_LIMIT
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
 ):
     if forks:
-        cfs = await get_forks(nodes, chains=chains, version=version, limit=limit)
-        print(
-            json.dumps(
-                {
-                    cid: [
-                        [
-                            {
-                                "height": h,
-                                "hash": hs,
-                                "nodes": list(nodes),
-                            }
-                            for (h, hs), nodes in level.items()
-                        ]
-                        for level in fs
-                    ]
-                    for cid, fs in cfs.items()
-                }
-            )
+        cfs = await get_forks(
+            nodes,
+            chains=chains,
+            version=version,
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
         )
+        print(json.dumps({cid: forks_json(fs) for cid, fs in cfs.items()}))
     else:
-        fps = await get_fork_points(nodes, chains=chains, version=version, limit=limit)
-        print(
-            json.dumps(
-                {
-                    cid: [
-                        {
-                            "nodes": list(nodes),
-                            "height": h,
-                        }
-                        for nodes, h in fp.items()
-                    ]
-                    for cid, fp in fps.items()
-                }
-            )
+        fps = await get_fork_points(
+            nodes,
+            chains=chains,
+            version=version,
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
+        )
+        print(json.dumps({cid: fork_points_json(fp) for cid, fp in fps.items()}))
+
+
+# Stream forks or fork points as one JSON record per line. Each chain is
+# written as soon as its branches are available from all nodes.
+#
+async def stream(
+    nodes: frozenset[Node],
+    chains: list[ChainId] | None = None,
+    forks: bool = False,
+    version: str = "evm-development",
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    timeout = aiohttp.ClientTimeout(connect=2, total=4)
+    async with limiter.session(timeout) as session:
+        branches = iter_branches_for_all_nodes(
+            session,
+            nodes,
+            chains=chains,
+            version=version,
+            limit=limit,
+            page_size=page_size,
+            limiter=limiter,
         )
+        async for cid, bs in branches:
+            if forks:
+                for level in iter_forks(bs):
+                    for (h, hs), ns in level.items():
+                        r = {"chain": cid, "height": h, "hash": str(hs), "nodes": list(ns)}
+                        sys.stdout.write(json.dumps(r) + "\n")
+            else:
+                for ns, h in fork_points(iter_forks(bs)).items():
+                    r = {"chain": cid, "nodes": list(ns), "height": h}
+                    sys.stdout.write(json.dumps(r) + "\n")
+            sys.stdout.flush()
+
+
+# Poll the nodes every `interval` seconds and print the forks or fork points of
+# the chains that changed as one JSON object per line.
+#
+async def watch(
+    nodes: frozenset[Node],
+    interval: float,
+    chains: list[ChainId] | None = None,
+    forks: bool = False,
+    version: str = "evm-development",
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    tracker = ForkTracker(
+        nodes,
+        chains=chains,
+        limit=limit,
+        page_size=page_size,
+        limiter=limiter,
+        version=version,
+    )
+    timeout = aiohttp.ClientTimeout(connect=2, total=4)
+    async with limiter.session(timeout) as session:
+        while True:
+            changed = await tracker.poll(session)
+            if changed:
+                if forks:
+                    r = {cid: forks_json(tracker.forks(cid)) for cid in sorted(changed)}
+                else:
+                    r = {cid: fork_points_json(tracker.fork_points(cid)) for cid in sorted(changed)}
+                print(json.dumps(r), flush=True)
+            await asyncio.sleep(interval)
+
+
+# Print the forks or fork points of the chains that changed each time a node
+# receives a new block header.
+#
+async def follow(
+    nodes: frozenset[Node],
+    chains: list[ChainId] | None = None,
+    forks: bool = False,
+    version: str = "evm-development",
+    limit: int = DEFAULT_LIMIT,
+    page_size: int | None = None,
+    limiter: Limiter | None = None,
+):
+    limiter = limiter or Limiter()
+    tracker = ForkTracker(
+        nodes,
+        chains=chains,
+        limit=limit,
+        page_size=page_size,
+        limiter=limiter,
+        version=version,
+    )
+    timeout = aiohttp.ClientTimeout(connect=2, total=4)
+    async with limiter.session(timeout) as session:
+        async for n, c in follow_cuts(session, nodes, limiter=limiter, version=version):
+            changed = await tracker.update(session, n, c)
+            if changed:
+                if forks:
+                    r = {cid: forks_json(tracker.forks(cid)) for cid in sorted(changed)}
+                else:
+                    r = {cid: fork_points_json(tracker.fork_points(cid)) for cid in sorted(changed)}
+                print(json.dumps(r), flush=True)
 
 
 if __name__ == "__main__":
@@ -447,6 +1230,11 @@ if __name__ == "__main__":
     parser.add_argument("--chains")
     parser.add_argument("--nodes")
     parser.add_argument("--depth")
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        help="Fetch branches in concurrent pages of PAGE_SIZE blocks",
+    )
     parser.add_argument(
         "--summary", action="store_true", help="Show cut summary of nodes"
     )
@@ -455,6 +1243,47 @@ if __name__ == "__main__":
         action="store_true",
         help="Show forks of nodes instead of fork points",
     )
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Print a single JSON object or stream one record per line",
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="INTERVAL",
+        help="Poll the nodes every INTERVAL seconds and print changes",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Subscribe to block header updates of the nodes and print changes",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        help="Number of samples for rolling statistics of --summary --watch",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=DEFAULT_MAX_REQUESTS,
+        help="Maximum number of concurrent requests",
+    )
+    parser.add_argument(
+        "--max-requests-per-node",
+        type=int,
+        default=DEFAULT_MAX_REQUESTS_PER_NODE,
+        help="Maximum number of concurrent requests to a single node",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="Number of retries for requests that time out",
+    )
     args = parser.parse_args()
 
     version = args.chainweb_version or "evm-development"
@@ -468,18 +1297,79 @@ if __name__ == "__main__":
         nodes = frozenset([f"{n}:1848" if ":" not in n else n for n in node_args])
     else:
         nodes = get_docker_project_nodes()
-        print(f"Found nodes: {nodes}")
+        print(f"Found nodes: {nodes}", file=sys.stderr)
 
     if args.chains is not None:
         chains = [int(c) for c in args.chains.split(",")]
     else:
         chains = None
 
-    if args.summary:
-        asyncio.run(summary(nodes, version))
+    limiter = Limiter(
+        max_requests=args.max_requests,
+        max_requests_per_node=args.max_requests_per_node,
+        retries=args.retries,
+    )
+
+    if args.summary and args.follow:
+        asyncio.run(follow_summary(nodes, version, limiter=limiter))
+    elif args.summary and args.watch is not None:
+        asyncio.run(
+            watch_summary(
+                nodes, args.watch, version, window=args.window, limiter=limiter
+            )
+        )
+    elif args.summary:
+        asyncio.run(summary(nodes, version, limiter=limiter))
         exit(0)
+    elif args.follow:
+        asyncio.run(
+            follow(
+                nodes,
+                chains,
+                args.forks,
+                version=version,
+                limit=limit,
+                page_size=args.page_size,
+                limiter=limiter,
+            )
+        )
+    elif args.watch is not None:
+        asyncio.run(
+            watch(
+                nodes,
+                args.watch,
+                chains,
+                args.forks,
+                version=version,
+                limit=limit,
+                page_size=args.page_size,
+                limiter=limiter,
+            )
+        )
+    elif args.format == "ndjson":
+        asyncio.run(
+            stream(
+                nodes,
+                chains,
+                args.forks,
+                version=version,
+                limit=limit,
+                page_size=args.page_size,
+                limiter=limiter,
+            )
+        )
     else:
-        asyncio.run(main(nodes, chains, args.forks, version=version, limit=limit))
+        asyncio.run(
+            main(
+                nodes,
+                chains,
+                args.forks,
+                version=version,
+                limit=limit,
+                page_size=args.page_size,
+                limiter=limiter,
+            )
+        )
 
 # ############################################################################ #
 
@@ -494,3 +1384,7 @@ hist = {
 def run_tests():
     print(forks(hist))
     print(fork_points(forks(hist)))
+
+
+# Benchmarks of forks and fork_points on larger synthetic histories are in
+# forksim.py.
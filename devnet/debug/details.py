@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+# Detailed information about the blocks of all chains at a given height.
+#
+# Produces the same JSON as `info` from functions.sh: the headers of the cut at
+# the given height keyed by chain id, each with its payload and EVM receipts,
+# merged with the fields of the cut. Headers, payloads and receipts of all
+# chains are requested concurrently.
+#
+# Usage:
+#
+# > ./details.py latest
+# > ./details.py 92094
+
+import aiohttp
+import argparse
+import asyncio
+import json
+import sys
+
+from cuts import BlockHash, BlockHeight, ChainId, Limiter, Node, fetch_json, get_cut
+from headerindex import (
+    DEFAULT_EVM_CHAINS,
+    HEADER_ENCODING,
+    Endpoints,
+    get_node,
+    get_payload,
+    get_receipts,
+)
+
+
+async def get_header(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    cid: ChainId,
+    hash: BlockHash,
+    *,
+    limiter: Limiter | None = None,
+) -> dict:
+    uri = f"{ep.service}/chain/{cid}/header/{hash}"
+    headers = {"accept": HEADER_ENCODING}
+    return await fetch_json(session, ep.node, "GET", uri, limiter=limiter, headers=headers)
+
+
+async def block_details(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    cid: ChainId,
+    hash: BlockHash,
+    *,
+    evm: bool = False,
+    limiter: Limiter | None = None,
+) -> dict:
+    """The header of a block with its payload and receipts"""
+    header = await get_header(session, ep, cid, hash, limiter=limiter)
+
+    async def payload():
+        try:
+            return (await get_payload(session, ep, header, limiter=limiter))[1]
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Failed to get payload of chain {cid}: {e}", file=sys.stderr)
+            return None
+
+    async def receipts():
+        if not evm:
+            return []
+        try:
+            rs = await get_receipts(session, ep, cid, [header], limiter=limiter)
+            return rs[0][1] if rs else []
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Failed to get receipts of chain {cid}: {e}", file=sys.stderr)
+            return []
+
+    p, r = await asyncio.gather(payload(), receipts())
+    return {"receipts": r, "payload": p} | header
+
+
+async def details(
+    node: Node,
+    height: BlockHeight | None = None,
+    *,
+    evm_chains: list[ChainId] = DEFAULT_EVM_CHAINS,
+    version: str = "evm-development",
+    limiter: Limiter | None = None,
+) -> dict:
+    limiter = limiter or Limiter()
+    ep = Endpoints(node, version)
+    timeout = aiohttp.ClientTimeout(connect=2, total=10)
+    async with limiter.session(timeout) as session:
+        # like functions.sh, approximate the cut at the block height by the
+        # cut height of a graph with 20 chains
+        maxheight = height * 20 if height is not None else None
+        cut = await get_cut(
+            session, node, maxheight=maxheight, limiter=limiter, version=version
+        )
+        if cut is None:
+            raise ValueError(f"Node {node} is not reachable")
+
+        async def run(cid, bh):
+            b = await block_details(
+                session, ep, cid, bh, evm=cid in evm_chains, limiter=limiter
+            )
+            return cid, b
+
+        results = await asyncio.gather(
+            *[run(cid, bh) for cid, (_, bh) in cut.hashes.items()]
+        )
+        return {
+            "headers": {str(cid): b for cid, b in sorted(results)},
+            "origin": cut.origin,
+            "weight": cut.weight,
+            "height": cut.height,
+            "instance": cut.instance.value,
+            "id": cut.id,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("height", nargs="?", default="latest")
+    parser.add_argument("--node")
+    parser.add_argument("--chainweb-version")
+    parser.add_argument(
+        "--evm-chains", default=",".join(str(c) for c in DEFAULT_EVM_CHAINS)
+    )
+    args = parser.parse_args()
+
+    height = None if args.height == "latest" else int(args.height)
+    evm_chains = [int(c) for c in args.evm_chains.split(",") if c]
+    version = args.chainweb_version or "evm-development"
+
+    r = asyncio.run(
+        details(get_node(args.node), height, evm_chains=evm_chains, version=version)
+    )
+    print(json.dumps(r))
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+# Synthetic chainweb histories for stress testing the fork analysis of cuts.py.
+#
+# A history assigns to each node a branch for each chain, in the same shape as
+# the branches that cuts.py fetches from the nodes. All nodes share a common
+# branch up to `reorg_depth` blocks below the top. Above that, at each block
+# height each branch forks with probability `fork_rate` and a random subset of
+# the nodes on it switches to a new branch. Nodes can lag behind the top by up
+# to `max_lag` blocks.
+#
+# The benchmark records the time and peak memory of branches_for_chain, forks
+# and fork_points for growing numbers of nodes and depths. With --compare it
+# also records the time of forks on the same histories as lists of ranked
+# hashes, and the ratio of the packed over the list time.
+#
+# Usage:
+#
+# > ./forksim.py
+# > ./forksim.py --nodes 16,256 --depths 1000,100000 --chains 2 --fork-rate 0.1
+# > ./forksim.py --nodes 64 --depths 10000 --chains 1 --compare
+
+from statistics import median
+from typing import Callable
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from cuts import (
+    HASH_SIZE,
+    Branch,
+    ChainId,
+    HashArray,
+    Hashed,
+    Node,
+    RankedHashes,
+    branches_for_chain,
+    fork_points,
+    forks,
+)
+
+DEFAULT_FORK_RATE = 0.05
+DEFAULT_REORG_DEPTH = 50
+DEFAULT_MAX_LAG = 2
+
+# Benchmark runs with more blocks in total are skipped. Each block takes
+# HASH_SIZE bytes in a packed branch and about LIST_BLOCK_SIZE bytes in a list
+# of ranked hashes. The default allows for 64 nodes at depth 100k on 4 chains.
+DEFAULT_MAX_BLOCKS = 32_000_000
+LIST_BLOCK_SIZE = 160
+
+# ############################################################################ #
+# Simulation
+
+
+def simulate_chain(
+    nodes: list[Node],
+    depth: int,
+    *,
+    fork_rate: float = DEFAULT_FORK_RATE,
+    reorg_depth: int = DEFAULT_REORG_DEPTH,
+    max_lag: int = DEFAULT_MAX_LAG,
+    packed: bool = True,
+    rnd: random.Random,
+) -> dict[Node, Branch]:
+    """
+    Branches of depth blocks of a single chain. With packed=False branches are
+    lists of ranked block hashes instead of RankedHashes.
+    """
+    top = depth - 1
+    window = min(reorg_depth, depth)
+
+    # Block hashes are random, so the common branch below the window can be
+    # used in order of decreasing height as it is.
+    common = rnd.randbytes((depth - window) * HASH_SIZE)
+
+    # Groups of nodes on the same branch, with the blocks of the branch in
+    # the window in order of increasing height
+    order = list(nodes)
+    rnd.shuffle(order)
+    groups: list[tuple[list[Node], bytearray]] = [(order, bytearray())]
+    for _ in range(window):
+        new = []
+        for ns, buf in groups:
+            if len(ns) > 1 and rnd.random() < fork_rate:
+                k = rnd.randint(1, len(ns) - 1)
+                new.append((ns[k:], bytearray(buf)))
+                ns = ns[:k]
+            new.append((ns, buf))
+        for _, buf in new:
+            buf += rnd.randbytes(HASH_SIZE)
+        groups = new
+
+    result: dict[Node, Branch] = {}
+    for ns, buf in groups:
+        top_hashes = b"".join(
+            buf[i : i + HASH_SIZE] for i in range(len(buf) - HASH_SIZE, -1, -HASH_SIZE)
+        ) + common
+        for n in ns:
+            lag = min(rnd.randint(0, max_lag), top)
+            hashes = HashArray.from_buffer(top_hashes[lag * HASH_SIZE :])
+            if packed:
+                result[n] = RankedHashes(top - lag, hashes)
+            else:
+                result[n] = [(top - lag - i, Hashed(h)) for i, h in enumerate(hashes)]
+    return result
+
+
+# Branches of all nodes and chains, in the shape of the branches of a
+# ForkTracker.
+#
+def simulate(
+    nodes: int,
+    chains: int,
+    depth: int,
+    *,
+    seed: int = 0,
+    **kwargs,
+) -> dict[Node, dict[ChainId, Branch]]:
+    names = [f"node-{i}" for i in range(nodes)]
+    result: dict[Node, dict[ChainId, Branch]] = {n: {} for n in names}
+    for cid in range(chains):
+        rnd = random.Random(f"{seed}:{cid}")
+        for n, b in simulate_chain(names, depth, rnd=rnd, **kwargs).items():
+            result[n][cid] = b
+    return result
+
+
+# ############################################################################ #
+# Benchmark
+
+
+def estimated_memory(blocks: int, packed: bool = True) -> int:
+    "Estimated bytes of the branches of a history with the given number of blocks"
+    return blocks * (HASH_SIZE if packed else LIST_BLOCK_SIZE)
+
+
+def measure(f: Callable[[], object], rounds: int) -> tuple[float, int]:
+    "Median seconds of a round and peak memory of a separate traced round"
+    seconds = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        f()
+        seconds.append(time.perf_counter() - t)
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return median(seconds), peak
+
+
+# Time and peak memory of the fork analysis of all chains of simulated
+# histories. Prints one JSON record per number of nodes and depth. Skipped
+# configurations are summarized on stderr at the end.
+#
+def run_benchmark(
+    nodes: list[int] = [4, 64, 256],
+    depths: list[int] = [1000, 10000, 100000],
+    *,
+    chains: int = 4,
+    rounds: int = 3,
+    max_blocks: int = DEFAULT_MAX_BLOCKS,
+    compare: bool = False,
+    **kwargs,
+):
+    skipped: list[tuple[int, int, int]] = []
+    for n in nodes:
+        for d in depths:
+            if n * d * chains > max_blocks:
+                skipped.append((n, d, n * d * chains))
+                continue
+
+            t = time.perf_counter()
+            branches = simulate(n, chains, d, **kwargs)
+            t_simulate = time.perf_counter() - t
+
+            by_chain = [branches_for_chain(branches, cid) for cid in range(chains)]
+            fs = [forks(b) for b in by_chain]
+            fps = [fork_points(f) for f in fs]
+
+            results = {
+                "branches_for_chain": measure(
+                    lambda: [branches_for_chain(branches, cid) for cid in range(chains)], rounds
+                ),
+                "forks": measure(lambda: [forks(b) for b in by_chain], rounds),
+                "fork_points": measure(lambda: [fork_points(f) for f in fs], rounds),
+            }
+            if compare:
+                # the same history, since packing does not consume randomness
+                lists = simulate(n, chains, d, **(kwargs | {"packed": False}))
+                lists_by_chain = [branches_for_chain(lists, cid) for cid in range(chains)]
+                results["forks_lists"] = measure(lambda: [forks(b) for b in lists_by_chain], rounds)
+                del lists, lists_by_chain
+            record = {
+                "nodes": n,
+                "chains": chains,
+                "depth": d,
+                "fork_points": sum(len(fp) for fp in fps),
+                "simulate.ms": round(t_simulate * 1000, 3),
+            }
+            for name, (seconds, peak) in results.items():
+                record[f"{name}.ms"] = round(seconds * 1000, 3)
+                record[f"{name}.peak_kib"] = round(peak / 1024)
+            if compare:
+                record["forks.packed_over_lists"] = round(
+                    results["forks"][0] / results["forks_lists"][0], 2
+                )
+            print(json.dumps(record), flush=True)
+
+    if skipped:
+        packed = kwargs.get("packed", True)
+        print(
+            f"skipped {len(skipped)} configurations with more than {max_blocks} blocks,"
+            f" run with --max-blocks {max(b for _, _, b in skipped)} to include them:",
+            file=sys.stderr,
+        )
+        for n, d, b in skipped:
+            gib = estimated_memory(b, packed) / 2**30
+            print(f"  {n} nodes at depth {d}: {b} blocks, about {gib:.1f} GiB of branches", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the fork analysis of cuts.py on simulated histories"
+    )
+    parser.add_argument("--nodes", default="4,64,256", help="comma separated numbers of nodes")
+    parser.add_argument("--depths", default="1000,10000,100000", help="comma separated branch depths")
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--fork-rate", type=float, default=DEFAULT_FORK_RATE)
+    parser.add_argument("--reorg-depth", type=int, default=DEFAULT_REORG_DEPTH)
+    parser.add_argument("--max-lag", type=int, default=DEFAULT_MAX_LAG)
+    parser.add_argument("--lists", action="store_true", help="use lists of ranked hashes instead of packed branches")
+    parser.add_argument("--compare", action="store_true", help="also time forks on lists of ranked hashes")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-blocks", type=int, default=DEFAULT_MAX_BLOCKS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(
+        [int(n) for n in args.nodes.split(",")],
+        [int(d) for d in args.depths.split(",")],
+        chains=args.chains,
+        rounds=args.rounds,
+        max_blocks=args.max_blocks,
+        compare=args.compare,
+        fork_rate=args.fork_rate,
+        reorg_depth=args.reorg_depth,
+        max_lag=args.max_lag,
+        packed=not args.lists,
+        seed=args.seed,
+    )
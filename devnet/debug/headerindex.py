@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+
+# Local index of the block headers, payloads and EVM receipts of a devnet node.
+#
+# Headers of all chains are ingested into a SQLite database. Each run of
+# `ingest` continues from the last indexed height of each chain. All headers in
+# the height range are indexed, including those of orphaned blocks. The
+# canonical blocks are those on the branch of the current cut of the node.
+# Queries are answered from the index without contacting the node.
+#
+# Usage:
+#
+# > ./headerindex.py ingest
+# > ./headerindex.py details latest
+# > ./headerindex.py receipts 20 --since 1000
+# > ./headerindex.py forks 20
+
+import os
+from typing import AsyncIterator
+import aiohttp
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+
+from cuts import (
+    BlockHash,
+    BlockHeight,
+    ChainId,
+    Limiter,
+    Node,
+    fetch_json,
+    get_cut,
+)
+
+# ############################################################################ #
+# Defaults
+
+DEFAULT_DB = "headers.db"
+DEFAULT_NODE = "bootnode-consensus:1848"
+DEFAULT_EVM_CHAINS = list(range(20, 25))
+
+# Number of blocks below the top of a chain that are indexed on the first run
+DEFAULT_DEPTH = 1000
+
+# Number of blocks below the last indexed height that are indexed again on each
+# run, in order to pick up reorgs.
+DEFAULT_REORG_DEPTH = 10
+
+DEFAULT_PAGE_SIZE = 100
+
+HEADER_ENCODING = "application/json;blockheader-encoding=object"
+
+# ############################################################################ #
+# Index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS headers (
+    hash TEXT PRIMARY KEY,
+    chain INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    payload_hash TEXT NOT NULL,
+    header TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS headers_chain_height ON headers (chain, height);
+
+CREATE TABLE IF NOT EXISTS canonical (
+    chain INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (chain, height)
+);
+
+CREATE TABLE IF NOT EXISTS payloads (
+    payload_hash TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS receipts (
+    hash TEXT PRIMARY KEY,
+    chain INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    receipts TEXT NOT NULL
+);
+"""
+
+
+class HeaderIndex:
+    """
+    Block headers keyed by hash and by (chain, height) of the canonical branch.
+
+    Headers of blocks that were replaced by a reorg are kept, which makes the
+    fork history of a chain available.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def last_height(self, cid: ChainId) -> BlockHeight | None:
+        row = self.db.execute(
+            "SELECT max(height) FROM canonical WHERE chain = ?", (cid,)
+        ).fetchone()
+        return row[0]
+
+    def add_headers(self, headers: list[dict]):
+        """Add headers of any branch"""
+        self.db.executemany(
+            "INSERT OR IGNORE INTO headers VALUES (?, ?, ?, ?, ?)",
+            [
+                (h["hash"], h["chainId"], h["height"], h["payloadHash"], json.dumps(h))
+                for h in headers
+            ],
+        )
+        self.db.commit()
+
+    def add_canonical(self, headers: list[dict]):
+        """Add headers of the canonical branch and make them canonical at their heights"""
+        self.db.executemany(
+            "INSERT OR IGNORE INTO headers VALUES (?, ?, ?, ?, ?)",
+            [
+                (h["hash"], h["chainId"], h["height"], h["payloadHash"], json.dumps(h))
+                for h in headers
+            ],
+        )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO canonical VALUES (?, ?, ?)",
+            [(h["chainId"], h["height"], h["hash"]) for h in headers],
+        )
+        self.db.commit()
+
+    def set_top(self, cid: ChainId, height: BlockHeight):
+        """Drop canonical entries above the top of a chain after a reorg"""
+        self.db.execute(
+            "DELETE FROM canonical WHERE chain = ? AND height > ?", (cid, height)
+        )
+        self.db.commit()
+
+    def add_payloads(self, payloads: list[tuple[str, dict]]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO payloads VALUES (?, ?)",
+            [(ph, json.dumps(p)) for ph, p in payloads],
+        )
+        self.db.commit()
+
+    def add_receipts(self, receipts: list[tuple[dict, list]]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO receipts VALUES (?, ?, ?, ?)",
+            [(h["hash"], h["chainId"], h["height"], json.dumps(r)) for h, r in receipts],
+        )
+        self.db.commit()
+
+    def chains(self) -> list[ChainId]:
+        rows = self.db.execute("SELECT DISTINCT chain FROM canonical ORDER BY chain")
+        return [ChainId(r[0]) for r in rows]
+
+    def block(self, cid: ChainId, height: BlockHeight) -> dict | None:
+        """
+        The canonical header at the given height, or the highest header below
+        it, with its payload and receipts.
+        """
+        row = self.db.execute(
+            """
+            SELECT h.header, p.payload, r.receipts
+            FROM canonical c
+            JOIN headers h ON h.hash = c.hash
+            LEFT JOIN payloads p ON p.payload_hash = h.payload_hash
+            LEFT JOIN receipts r ON r.hash = h.hash
+            WHERE c.chain = ? AND c.height <= ?
+            ORDER BY c.height DESC LIMIT 1
+            """,
+            (cid, height),
+        ).fetchone()
+        if row is None:
+            return None
+        header, payload, receipts = row
+        return {
+            "receipts": json.loads(receipts) if receipts else [],
+            "payload": json.loads(payload) if payload else None,
+        } | json.loads(header)
+
+    def details(self, height: BlockHeight | None = None) -> dict:
+        """
+        Headers of all chains at the given height, or at the top of each chain
+        if no height is given.
+        """
+        h = height if height is not None else sys.maxsize
+        blocks = {cid: self.block(cid, h) for cid in self.chains()}
+        headers = {str(cid): b for cid, b in blocks.items() if b is not None}
+        return {
+            "headers": headers,
+            "height": sum(b["height"] for b in headers.values()),
+        }
+
+    def receipts(self, cid: ChainId, since: BlockHeight = 0) -> list:
+        rows = self.db.execute(
+            """
+            SELECT r.receipts
+            FROM canonical c JOIN receipts r ON r.hash = c.hash
+            WHERE c.chain = ? AND c.height >= ?
+            ORDER BY c.height
+            """,
+            (cid, since),
+        )
+        return [x for (rs,) in rows for x in json.loads(rs)]
+
+    def forks(self, cid: ChainId) -> list[dict]:
+        """Heights at which more than one block was indexed"""
+        rows = self.db.execute(
+            """
+            SELECT h.height, group_concat(h.hash), c.hash
+            FROM headers h JOIN canonical c ON c.chain = h.chain AND c.height = h.height
+            WHERE h.chain = ?
+            GROUP BY h.height HAVING count(*) > 1
+            ORDER BY h.height
+            """,
+            (cid,),
+        )
+        return [
+            {"height": h, "hashes": hs.split(","), "canonical": c} for h, hs, c in rows
+        ]
+
+
+# ############################################################################ #
+# Ingestion
+
+
+# Endpoints of a node. The P2P API serves payloads, the EVM nodes of a chainweb
+# node are named after the consensus service.
+#
+class Endpoints:
+    def __init__(
+        self,
+        node: Node,
+        version: str = "evm-development",
+        p2p_port: int = 1789,
+        evm_port: int = 8545,
+    ):
+        host = node.split(":")[0]
+        name = host.removesuffix("-consensus")
+        self.node = node
+        self.version = version
+        self.service = f"http://{node}/chainweb/0.0/{version}"
+        self.p2p = f"https://{host}:{p2p_port}/chainweb/0.0/{version}"
+        self.evm = lambda cid: f"http://{name}-evm-{cid}:{evm_port}"
+
+
+async def get_headers(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    cid: ChainId,
+    minheight: BlockHeight,
+    *,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    limiter: Limiter | None = None,
+) -> AsyncIterator[list[dict]]:
+    """Yield pages of the headers of a chain from the given height upward"""
+    uri = f"{ep.service}/chain/{cid}/header"
+    next = None
+    while True:
+        params = {"minheight": minheight, "limit": page_size}
+        if next is not None:
+            params["next"] = next
+        json = await fetch_json(
+            session,
+            ep.node,
+            "GET",
+            uri,
+            limiter=limiter,
+            params=params,
+            headers={"accept": HEADER_ENCODING},
+        )
+        if json["items"]:
+            yield json["items"]
+        next = json["next"]
+        if next is None:
+            return
+
+
+async def get_branch_headers(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    cid: ChainId,
+    upper: BlockHash,
+    minheight: BlockHeight,
+    *,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    limiter: Limiter | None = None,
+) -> AsyncIterator[list[dict]]:
+    """
+    Yield pages of the headers of the branch of the given block down to the
+    given height, in order of decreasing height
+    """
+    uri = f"{ep.service}/chain/{cid}/header/branch"
+    next = None
+    while True:
+        params = {"minheight": minheight, "limit": page_size}
+        if next is not None:
+            params["next"] = next
+        json = await fetch_json(
+            session,
+            ep.node,
+            "POST",
+            uri,
+            limiter=limiter,
+            params=params,
+            headers={"accept": HEADER_ENCODING},
+            json={"upper": [f"{upper}"], "lower": []},
+        )
+        if json["items"]:
+            yield json["items"]
+        next = json["next"]
+        if next is None:
+            return
+
+
+async def gather_all(*aws):
+    """
+    Like asyncio.gather, but wait for all awaitables to finish before raising
+    the first exception, so that no request outlives the call
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+    return results
+
+
+async def get_payload(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    header: dict,
+    *,
+    limiter: Limiter | None = None,
+) -> tuple[str, dict]:
+    ph = header["payloadHash"]
+    uri = f"{ep.p2p}/chain/{header['chainId']}/height/{header['height']}/payload/{ph}"
+    return ph, await fetch_json(session, ep.node, "GET", uri, limiter=limiter, ssl=False)
+
+
+async def get_receipts(
+    session: aiohttp.ClientSession,
+    ep: Endpoints,
+    cid: ChainId,
+    headers: list[dict],
+    *,
+    limiter: Limiter | None = None,
+) -> list[tuple[dict, list]]:
+    """Receipts of the EVM blocks of the given headers in a single batch"""
+    body = [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_getBlockReceipts",
+            "params": [hex(h["height"])],
+        }
+        for i, h in enumerate(headers)
+    ]
+    json = await fetch_json(session, ep.node, "POST", ep.evm(cid), limiter=limiter, json=body)
+    results = {r["id"]: r.get("result") for r in json}
+    return [(h, results[i] or []) for i, h in enumerate(headers) if i in results]
+
+
+async def ingest_chain(
+    session: aiohttp.ClientSession,
+    index: HeaderIndex,
+    ep: Endpoints,
+    cid: ChainId,
+    top: BlockHeight,
+    top_hash: BlockHash,
+    *,
+    depth: int = DEFAULT_DEPTH,
+    reorg_depth: int = DEFAULT_REORG_DEPTH,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    evm: bool = False,
+    limiter: Limiter | None = None,
+) -> int:
+    last = index.last_height(cid)
+    if last is None:
+        minheight = max(0, top - depth)
+    else:
+        minheight = max(0, min(last, top) - reorg_depth)
+
+    # headers and payloads of all blocks in the range, including orphans
+    count = 0
+    async for headers in get_headers(
+        session, ep, cid, minheight, page_size=page_size, limiter=limiter
+    ):
+        payloads = await gather_all(
+            *[get_payload(session, ep, h, limiter=limiter) for h in headers]
+        )
+        index.add_payloads(payloads)
+        index.add_headers(headers)
+        count += len(headers)
+
+    # The canonical blocks are those on the branch of the cut. Receipts are
+    # requested by height, so they are only valid for canonical blocks.
+    async for headers in get_branch_headers(
+        session, ep, cid, top_hash, minheight, page_size=page_size, limiter=limiter
+    ):
+        if evm:
+            receipts = await get_receipts(session, ep, cid, headers, limiter=limiter)
+            index.add_receipts(receipts)
+        index.add_canonical(headers)
+    index.set_top(cid, top)
+    return count
+
+
+async def ingest(
+    index: HeaderIndex,
+    node: Node,
+    *,
+    chains: list[ChainId] | None = None,
+    evm_chains: list[ChainId] = DEFAULT_EVM_CHAINS,
+    depth: int = DEFAULT_DEPTH,
+    reorg_depth: int = DEFAULT_REORG_DEPTH,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    version: str = "evm-development",
+    limiter: Limiter | None = None,
+) -> dict[ChainId, int]:
+    """
+    Index the blocks of all chains up to the current cut of the node. Returns
+    the number of indexed blocks per chain.
+    """
+    limiter = limiter or Limiter()
+    ep = Endpoints(node, version)
+    timeout = aiohttp.ClientTimeout(connect=2, total=10)
+    async with limiter.session(timeout) as session:
+        cut = await get_cut(session, node, limiter=limiter, version=version)
+        if cut is None:
+            raise ValueError(f"Node {node} is not reachable")
+
+        async def run(cid, h, bh):
+            try:
+                n = await ingest_chain(
+                    session,
+                    index,
+                    ep,
+                    cid,
+                    h,
+                    bh,
+                    depth=depth,
+                    reorg_depth=reorg_depth,
+                    page_size=page_size,
+                    evm=cid in evm_chains,
+                    limiter=limiter,
+                )
+                return cid, n
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Failed to index chain {cid}: {e}", file=sys.stderr)
+                return cid, 0
+
+        results = await asyncio.gather(
+            *[
+                run(cid, h, bh)
+                for cid, (h, bh) in cut.hashes.items()
+                if chains is None or cid in chains
+            ]
+        )
+        return dict(results)
+
+
+def get_node(node: str | None = None) -> Node:
+    """The given node, the first node in CL_NODES, or the bootnode"""
+    if node is None:
+        env = os.getenv("CL_NODES")
+        node = env.split(",")[0] if env else DEFAULT_NODE
+    return Node(f"{node}:1848" if ":" not in node else node)
+
+
+# ############################################################################ #
+# Main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=os.getenv("HEADER_INDEX", DEFAULT_DB))
+    parser.add_argument("--node")
+    parser.add_argument("--chainweb-version")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Index new blocks of all chains")
+    p.add_argument("--chains")
+    p.add_argument(
+        "--evm-chains", default=",".join(str(c) for c in DEFAULT_EVM_CHAINS)
+    )
+    p.add_argument(
+        "--depth",
+        type=int,
+        default=DEFAULT_DEPTH,
+        help="Number of blocks below the top that are indexed on the first run",
+    )
+    p.add_argument(
+        "--reorg-depth",
+        type=int,
+        default=DEFAULT_REORG_DEPTH,
+        help="Number of indexed blocks that are checked again for reorgs",
+    )
+    p.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+
+    p = sub.add_parser("details", help="Show blocks of all chains at a height")
+    p.add_argument("height", nargs="?", default="latest")
+
+    p = sub.add_parser("receipts", help="Show receipts of a chain since a height")
+    p.add_argument("chain", type=int)
+    p.add_argument("--since", type=int, default=0)
+
+    p = sub.add_parser("forks", help="Show heights with more than one block")
+    p.add_argument("chain", type=int)
+
+    args = parser.parse_args()
+
+    version = args.chainweb_version or "evm-development"
+
+    node = get_node(args.node)
+
+    with HeaderIndex(args.db) as index:
+        match args.command:
+            case "ingest":
+                chains = (
+                    [int(c) for c in args.chains.split(",")]
+                    if args.chains is not None
+                    else None
+                )
+                evm_chains = [int(c) for c in args.evm_chains.split(",") if c]
+                counts = asyncio.run(
+                    ingest(
+                        index,
+                        node,
+                        chains=chains,
+                        evm_chains=evm_chains,
+                        depth=args.depth,
+                        reorg_depth=args.reorg_depth,
+                        page_size=args.page_size,
+                        version=version,
+                    )
+                )
+                print(json.dumps(counts))
+            case "details":
+                height = None if args.height == "latest" else int(args.height)
+                print(json.dumps(index.details(height)))
+            case "receipts":
+                print(json.dumps(index.receipts(args.chain, args.since)))
+            case "forks":
+                print(json.dumps(index.forks(args.chain)))
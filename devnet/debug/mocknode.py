@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+# A stand-in for a chainweb node and a reth node that serves synthetic or
+# recorded responses, for benchmarking the debug tools without a devnet.
+#
+# Served endpoints:
+#
+# - chainweb service API: /cut, /chain/{cid}/hash/branch, /chain/{cid}/header,
+#   and /chain/{cid}/header/{hash}
+# - Ethereum and Engine JSON-RPC on POST /, including batches
+#
+# Latency, jitter and error rate are configurable. Several nodes can be started
+# on consecutive ports; node i forks away from node 0 in the last `fork_depth`
+# blocks of each chain.
+#
+# Usage:
+#
+# > ./mocknode.py --nodes 4 --port 1848 --chains 20 --height 10000 --latency 0.005
+# > ./cuts.py --nodes localhost:1848,localhost:1849
+#
+# Recorded responses, for instance from `pyrpc/bench_codec.py --record`, are
+# served for the methods for which there is a file named `*-{method}.json`:
+#
+# > ./mocknode.py --responses pyrpc/responses
+
+from dataclasses import dataclass
+from aiohttp import web
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+
+# ############################################################################ #
+# Configuration
+
+
+@dataclass
+class MockConfig:
+    # delay of each response in seconds
+    latency: float = 0.0
+
+    # maximum random deviation of the delay in seconds
+    jitter: float = 0.0
+
+    # probability that a request fails with HTTP 503 or, for JSON-RPC calls,
+    # with an error object
+    error_rate: float = 0.0
+
+    # number of transactions per EVM block
+    txs: int = 10
+
+    seed: int = 0
+
+
+# ############################################################################ #
+# Synthetic Chains
+
+
+def mk_hash(*seed) -> str:
+    return base64.urlsafe_b64encode(
+        hashlib.sha256(repr(seed).encode()).digest()
+    ).decode().rstrip("=")
+
+
+# The blocks of all chains of a node. Block hashes are derived from chain,
+# height and, in the last `fork_depth` blocks, the branch of the node.
+#
+class MockChains:
+    def __init__(
+        self,
+        chains: int = 20,
+        height: int = 1000,
+        branch: int = 0,
+        fork_depth: int = 0,
+    ):
+        self.height = height
+        self.fork_height = height - fork_depth if branch else height + 1
+        self.branch = branch
+        self.chains = {
+            cid: [self.block_hash(cid, h) for h in range(height + 1)]
+            for cid in range(chains)
+        }
+        self.heights = {
+            bh: h for hs in self.chains.values() for h, bh in enumerate(hs)
+        }
+
+    def block_hash(self, cid: int, height: int) -> str:
+        if height >= self.fork_height:
+            return mk_hash(cid, height, self.branch)
+        return mk_hash(cid, height)
+
+    def header(self, cid: int, height: int) -> dict:
+        bh = self.chains[cid][height]
+        return {
+            "chainId": cid,
+            "height": height,
+            "hash": bh,
+            "parent": self.chains[cid][height - 1] if height > 0 else bh,
+            "payloadHash": mk_hash("payload", bh),
+            "weight": base64.urlsafe_b64encode(height.to_bytes(32, "little")).decode().rstrip("="),
+            "creationTime": 1700000000000000 + height * 2000000,
+            "chainwebVersion": "evm-development",
+            "featureFlags": 0,
+            "nonce": "0",
+            "adjacents": {},
+        }
+
+
+# ############################################################################ #
+# Chainweb API
+
+
+def chainweb_routes(chains: MockChains, version: str = "evm-development") -> list:
+    base = f"/chainweb/0.0/{version}"
+
+    async def cut(req):
+        return web.json_response(
+            {
+                "hashes": {
+                    str(cid): {"height": len(hs) - 1, "hash": hs[-1]}
+                    for cid, hs in chains.chains.items()
+                },
+                "weight": "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA",
+                "height": sum(len(hs) - 1 for hs in chains.chains.values()),
+                "instance": version,
+                "id": mk_hash("cut", chains.branch, chains.height),
+            }
+        )
+
+    def query_int(req, name, default):
+        return int(req.query[name]) if name in req.query else default
+
+    async def branch_page(req) -> tuple[int, list[int], str | None]:
+        cid = int(req.match_info["cid"])
+        hs = chains.chains[cid]
+        body = await req.json()
+        limit = query_int(req, "limit", 1000)
+        minheight = query_int(req, "minheight", 0)
+        maxheight = query_int(req, "maxheight", len(hs) - 1)
+
+        # blocks below any lower bound that is known to this node are excluded
+        lower = [chains.heights[h] for h in body.get("lower", []) if h in chains.heights]
+        bottom = max(lower, default=-1) + 1
+        top = chains.heights[body["upper"][0]]
+        if "next" in req.query:
+            top = chains.heights[req.query["next"].split(":")[1]]
+        top = min(top, maxheight)
+        low = max(bottom, minheight)
+
+        heights = list(range(top, max(low, top - limit + 1) - 1, -1))
+        n = top - limit
+        next = f"inclusive:{hs[n]}" if heights and n >= low else None
+        return cid, heights, next
+
+    async def branch(req):
+        cid, heights, next = await branch_page(req)
+        items = [chains.chains[cid][h] for h in heights]
+        return web.json_response({"items": items, "limit": len(items), "next": next})
+
+    async def header_branch(req):
+        cid, heights, next = await branch_page(req)
+        items = [chains.header(cid, h) for h in heights]
+        return web.json_response({"items": items, "limit": len(items), "next": next})
+
+    async def headers(req):
+        cid = int(req.match_info["cid"])
+        top = len(chains.chains[cid]) - 1
+        limit = query_int(req, "limit", 1000)
+        minheight = query_int(req, "minheight", 0)
+        maxheight = min(query_int(req, "maxheight", top), top)
+        start = int(req.query["next"].split(":")[1]) if "next" in req.query else minheight
+        end = min(start + limit - 1, maxheight)
+        items = [chains.header(cid, h) for h in range(start, end + 1)]
+        next = f"inclusive:{end + 1}" if end < maxheight else None
+        return web.json_response({"items": items, "limit": len(items), "next": next})
+
+    async def header(req):
+        cid = int(req.match_info["cid"])
+        h = chains.heights.get(req.match_info["hash"])
+        if h is None:
+            raise web.HTTPNotFound()
+        return web.json_response(chains.header(cid, h))
+
+    return [
+        web.get(f"{base}/cut", cut),
+        web.post(f"{base}/chain/{{cid}}/hash/branch", branch),
+        web.post(f"{base}/chain/{{cid}}/header/branch", header_branch),
+        web.get(f"{base}/chain/{{cid}}/header", headers),
+        web.get(f"{base}/chain/{{cid}}/header/{{hash}}", header),
+    ]
+
+
+# ############################################################################ #
+# Ethereum and Engine JSON-RPC
+
+
+def load_responses(dir: str) -> dict[str, list]:
+    """Results of recorded responses by method, from files named *-{method}.json"""
+    result: dict[str, list] = {}
+    for name in sorted(os.listdir(dir)):
+        method = name.removesuffix(".json").rsplit("-", 1)[-1]
+        with open(os.path.join(dir, name), "rb") as f:
+            result.setdefault(method, []).append(json.loads(f.read()).get("result"))
+    return result
+
+
+class MockEth:
+    def __init__(self, config: MockConfig, height: int = 1000, recorded: dict[str, list] | None = None):
+        self.config = config
+        self.height = height
+        self.recorded = recorded or {}
+        self.calls = 0
+
+    def block_hash(self, n: int) -> str:
+        return "0x" + hashlib.sha256(f"block{n}".encode()).hexdigest()
+
+    def tx_hash(self, n: int, i: int) -> str:
+        return "0x" + hashlib.sha256(f"tx{n}:{i}".encode()).hexdigest()
+
+    def number(self, spec) -> int:
+        if spec in ("latest", "safe", "finalized", "pending"):
+            return self.height
+        if spec == "earliest":
+            return 0
+        return int(spec, 16)
+
+    def block(self, n: int, full: bool = False) -> dict:
+        txs = [self.tx_hash(n, i) for i in range(self.config.txs)]
+        if full:
+            txs = [
+                {"hash": t, "blockNumber": hex(n), "blockHash": self.block_hash(n), "transactionIndex": hex(i), "input": "0x"}
+                for i, t in enumerate(txs)
+            ]
+        return {
+            "number": hex(n),
+            "hash": self.block_hash(n),
+            "parentHash": self.block_hash(n - 1),
+            "timestamp": hex(1700000000 + n * 2),
+            "transactions": txs,
+        }
+
+    def receipt(self, n: int, i: int) -> dict:
+        return {
+            "transactionHash": self.tx_hash(n, i),
+            "transactionIndex": hex(i),
+            "blockNumber": hex(n),
+            "blockHash": self.block_hash(n),
+            "status": "0x1",
+            "gasUsed": hex(21000),
+            "logs": [self.log(n, i)],
+        }
+
+    def log(self, n: int, i: int) -> dict:
+        return {"blockNumber": hex(n), "transactionIndex": hex(i), "logIndex": hex(i), "data": "0x"}
+
+    def result(self, method: str, params: list):
+        if method in self.recorded:
+            rs = self.recorded[method]
+            return rs[self.calls % len(rs)]
+        match method:
+            case "eth_chainId":
+                return hex(1789)
+            case "eth_blockNumber":
+                return hex(self.height)
+            case "eth_syncing":
+                return False
+            case "eth_getBlockByNumber":
+                return self.block(self.number(params[0]), len(params) > 1 and params[1])
+            case "eth_getBlockReceipts":
+                n = self.number(params[0])
+                return [self.receipt(n, i) for i in range(self.config.txs)]
+            case "eth_getLogs":
+                f = params[0]
+                a, b = self.number(f.get("fromBlock", "earliest")), self.number(f.get("toBlock", "latest"))
+                return [self.log(n, i) for n in range(a, b + 1) for i in range(self.config.txs)]
+            case "engine_forkchoiceUpdatedV3":
+                return {"payloadStatus": {"status": "VALID", "latestValidHash": params[0]["headBlockHash"]}, "payloadId": "0x0000000000000001"}
+            case "engine_getPayloadV3":
+                return {"executionPayload": self.block(self.height), "blockValue": "0x0"}
+            case "engine_newPayloadV3":
+                return {"status": "VALID", "latestValidHash": self.block_hash(self.height)}
+            case "admin_nodeInfo":
+                return {"enode": "enode://mock@127.0.0.1:30303"}
+        raise KeyError(method)
+
+    def respond(self, req: dict) -> dict:
+        self.calls += 1
+        rid = req.get("id")
+        if random.random() < self.config.error_rate:
+            return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32000, "message": "injected error"}}
+        try:
+            return {"jsonrpc": "2.0", "id": rid, "result": self.result(req["method"], req.get("params") or [])}
+        except KeyError:
+            return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32601, "message": "method not found"}}
+
+    def routes(self) -> list:
+        async def rpc(req):
+            body = await req.json()
+            if isinstance(body, list):
+                return web.json_response([self.respond(r) for r in body])
+            return web.json_response(self.respond(body))
+
+        return [web.post("/", rpc)]
+
+
+# ############################################################################ #
+# Server
+
+
+def mk_app(config: MockConfig, chains: MockChains, eth: MockEth) -> web.Application:
+    @web.middleware
+    async def faults(req, handler):
+        delay = config.latency + random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # JSON-RPC errors are injected per call
+        if req.path != "/" and random.random() < config.error_rate:
+            raise web.HTTPServiceUnavailable()
+        return await handler(req)
+
+    app = web.Application(middlewares=[faults])
+    app.add_routes(chainweb_routes(chains))
+    app.add_routes(eth.routes())
+    return app
+
+
+async def serve(
+    config: MockConfig,
+    *,
+    nodes: int = 1,
+    port: int = 1848,
+    chains: int = 20,
+    height: int = 1000,
+    fork_depth: int = 0,
+    recorded: dict[str, list] | None = None,
+    host: str = "127.0.0.1",
+) -> list[web.AppRunner]:
+    """Start `nodes` mock nodes on consecutive ports. Returns their runners."""
+    random.seed(config.seed)
+    runners = []
+    for i in range(nodes):
+        app = mk_app(
+            config,
+            MockChains(chains, height, branch=i, fork_depth=fork_depth),
+            MockEth(config, height, recorded),
+        )
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port + i).start()
+        runners.append(runner)
+    return runners
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1848)
+    parser.add_argument("--nodes", type=int, default=1)
+    parser.add_argument("--chains", type=int, default=20)
+    parser.add_argument("--height", type=int, default=1000)
+    parser.add_argument("--fork-depth", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--txs", type=int, default=10)
+    parser.add_argument("--responses", help="directory with recorded JSON-RPC responses")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.txs)
+    recorded = load_responses(args.responses) if args.responses else None
+
+    async def main():
+        await serve(
+            config,
+            nodes=args.nodes,
+            port=args.port,
+            chains=args.chains,
+            height=args.height,
+            fork_depth=args.fork_depth,
+            recorded=recorded,
+            host=args.host,
+        )
+        print(f"Serving {args.nodes} mock nodes on {args.host}:{args.port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
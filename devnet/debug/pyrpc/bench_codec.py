@@ -0,0 +1,110 @@
+# Benchmark of the JSON codecs of the RPC clients.
+#
+# Record responses from a reth node into a directory:
+#
+# > python3 bench_codec.py --record http://bootnode-evm-20:8545 --dir responses
+#
+# Benchmark decoding and encoding of the recorded responses with all installed
+# codecs:
+#
+# > python3 bench_codec.py --dir responses
+#
+# Without a directory, synthetic responses that are shaped like blocks with
+# full transactions are used.
+
+import argparse
+import os
+import random
+import time
+
+# local modules
+from rpc import CODECS, Codec, RPC, Url, json_codec
+from execution_api import block_param
+
+def record(url: Url, dir: str, blocks: int = 20):
+    "Save raw responses of the latest blocks with full transactions and their traces"
+    os.makedirs(dir, exist_ok=True)
+    client = RPC(url, codec=json_codec())
+    latest = int(client.rpc("eth_blockNumber"), 16)
+    for n in range(max(0, latest - blocks + 1), latest + 1):
+        for method, params in [
+            ("eth_getBlockByNumber", [block_param(n), True]),
+            ("eth_getBlockReceipts", [block_param(n)]),
+            ("debug_traceBlockByNumber", [block_param(n), {"tracer": "callTracer"}]),
+        ]:
+            r = client.session.post(url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, timeout=60)
+            with open(os.path.join(dir, f"{n}-{method}.json"), "wb") as f:
+                f.write(r.content)
+
+def synthetic_responses(count: int = 20, txs: int = 200) -> list[bytes]:
+    "Responses shaped like reth blocks with full transactions"
+    codec = json_codec()
+    rnd = random.Random(0)
+    hx = lambda n: "0x" + rnd.randbytes(n).hex()
+    def tx(i):
+        return {
+            "hash": hx(32), "nonce": hex(i), "blockHash": hx(32), "blockNumber": hex(i),
+            "transactionIndex": hex(i), "from": hx(20), "to": hx(20), "value": hex(rnd.getrandbits(64)),
+            "gas": hex(21000), "gasPrice": hex(rnd.getrandbits(40)), "input": hx(rnd.randint(0, 512)),
+            "v": "0x1", "r": hx(32), "s": hx(32), "type": "0x2", "chainId": "0x5e9",
+            "accessList": [],
+        }
+    return [
+        codec.dumps({"jsonrpc": "2.0", "id": 1, "result": {
+            "number": hex(n), "hash": hx(32), "parentHash": hx(32), "logsBloom": hx(256),
+            "transactions": [tx(i) for i in range(txs)],
+        }})
+        for n in range(count)
+    ]
+
+def load_responses(dir: str) -> list[bytes]:
+    result = []
+    for name in sorted(os.listdir(dir)):
+        with open(os.path.join(dir, name), "rb") as f:
+            result.append(f.read())
+    return result
+
+def installed_codecs() -> list[Codec]:
+    result = []
+    for mk in CODECS.values():
+        try:
+            result.append(mk())
+        except ImportError:
+            pass
+    return result
+
+def bench(codec: Codec, responses: list[bytes], rounds: int) -> tuple[float, float]:
+    "Seconds per round for decoding and encoding all responses"
+    t = time.perf_counter()
+    for _ in range(rounds):
+        decoded = [codec.loads(r) for r in responses]
+    decode = (time.perf_counter() - t) / rounds
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for d in decoded:
+            codec.dumps(d)
+    encode = (time.perf_counter() - t) / rounds
+    return decode, encode
+
+def run_benchmark(responses: list[bytes], rounds: int = 10):
+    size = sum(len(r) for r in responses)
+    print(f"{len(responses)} responses, {size / 1e6:.1f} MB")
+    print(f"{'codec':>8} {'decode ms':>10} {'MB/s':>8} {'encode ms':>10}")
+    for codec in installed_codecs():
+        decode, encode = bench(codec, responses, rounds)
+        print(f"{codec.name:>8} {decode * 1000:>10.1f} {size / 1e6 / decode:>8.0f} {encode * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON codecs on RPC responses")
+    parser.add_argument("--dir", help="directory with recorded responses")
+    parser.add_argument("--record", metavar="URL", help="record responses from the node at URL into --dir")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.record is not None:
+        if args.dir is None:
+            parser.error("--record requires --dir")
+        record(args.record, args.dir)
+    else:
+        responses = load_responses(args.dir) if args.dir else synthetic_responses()
+        run_benchmark(responses, args.rounds)
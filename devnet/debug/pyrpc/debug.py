@@ -6,15 +6,13 @@ NODE = "bootnode"
 NODE_URL = f"http://{NODE}:8551"
 JWT_SECRET = os.getenv("JWT_SECRET", "0x")
 
-engine = engine_api.EngineClient(NODE_URL, JWT_SECRET)
+engine = engine_api.EngineRPC(NODE_URL, JWT_SECRET)
 
 def get_forkchoice_state(n: int|None = 0) -> engine_api.ForkChoiceState:
     """
     Get fork choice state at depth of n.
     """
-    latest = engine.eth_getBlockByNumber("latest")
-    safe = engine.eth_getBlockByNumber("safe")
-    final = engine.eth_getBlockByNumber("finalized")
+    latest, safe, final = engine.get_blocks_by_number(["latest", "safe", "finalized"])
 
     if n is None or n == 0:
         new_head = latest
@@ -36,9 +34,7 @@ def rewind_forkchoice_update_params(n: int, produceBlock: bool = True) -> engine
     if n <= 0:
         raise ValueError("n must be greater than 0")
 
-    latest = engine.eth_getBlockByNumber("latest")
-    safe = engine.eth_getBlockByNumber("safe")
-    final = engine.eth_getBlockByNumber("finalized")
+    latest, safe, final = engine.get_blocks_by_number(["latest", "safe", "finalized"])
     new_head = engine.eth_getBlockByNumber(int(latest["number"],16) - n)
     new_state = engine_api.ForkChoiceState(
         headBlockHash=new_head["hash"],
@@ -62,9 +58,7 @@ def rewind_forkchoice_update_params(n: int, produceBlock: bool = True) -> engine
 # Test Rewind and catchup of EL client
 
 # current state
-latest = engine.eth_getBlockByNumber("latest")
-safe = engine.eth_getBlockByNumber("safe")
-final = engine.eth_getBlockByNumber("finalized")
+latest, safe, final = engine.get_blocks_by_number(["latest", "safe", "finalized"])
 
 # docker compose stop NODE
 
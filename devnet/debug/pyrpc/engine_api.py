@@ -1,10 +1,17 @@
 from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable
 import asyncio
+import glob
 import json
 import logging
+import os
+import time
+import aiohttp
+import requests
+import yaml
 
 # local modules
-from rpc import AuthRPC, RpcException, RpcErrorException, Url
+from rpc import AuthRPC, AsyncAuthRPC, Backoff, get_async_pool, RpcException, RpcErrorException, RpcCircuitOpenException, Url
 from execution_api import *
 from ethtypes import *
 
@@ -103,25 +110,22 @@ def fork_choice_update_params(
 def fork_sync_params(fork_choice_state: ForkChoiceState) -> ForkChoiceParams:
     return (fork_choice_state, None)
 
+def fork_choice_params_json(params: ForkChoiceParams) -> list[dict|None]:
+    "Encode fork choice params as JSON-RPC parameters"
+    return [asdict(params[0]), asdict(params[1]) if params[1] is not None else None]
+
 # ############################################################################ #
 # Ethereum Engine JSON-RPC
 
-# Engine RPC
-class EngineRPC(AuthRPC, CommonEthRPC):
-    "Engine JSON-RPC client"
-
-    def __init__(self, url: Url, jwt_secret: HexString):
-        super().__init__(url, jwt_secret = jwt_secret)
+# Engine methods, shared by the synchronous and the asynchronous clients
+class EngineMethods:
+    "Engine JSON-RPC methods"
 
-    # eth methods
-    # Inherited from CommonEthRPC
-
-    # engine methods
     def engine_exchangeCapabilities(self):
         return self.rpc("engine_exchangeCapabilities")
 
     def engine_forkchoiceUpdatedV3(self, params: ForkChoiceParams):
-        params_dict = [asdict(params[0]), asdict(params[1]) if params[1] is not None else None]
+        params_dict = fork_choice_params_json(params)
         logger.info("Calling engine_forkchoiceUpdatedV3 with %s", params_dict)
         return self.rpc("engine_forkchoiceUpdatedV3", params_dict)
 
@@ -131,11 +135,147 @@ class EngineRPC(AuthRPC, CommonEthRPC):
     def engine_newPayloadV3(self):
         return self.rpc("engine_newPayloadV3")
 
+# Engine RPC
+class EngineRPC(EngineMethods, AuthRPC, CommonEthRPC):
+    "Engine JSON-RPC client"
+
+    def __init__(self, url: Url, jwt_secret: HexString, session: requests.Session|None = None):
+        super().__init__(url, jwt_secret = jwt_secret, session = session)
+
+# Asynchronous Engine RPC
+class AsyncEngineRPC(EngineMethods, AsyncAuthRPC, AsyncCommonEthRPC):
+    "Asynchronous Engine JSON-RPC client"
+
+    def __init__(self, url: Url, jwt_secret: HexString, session: aiohttp.ClientSession|None = None):
+        super().__init__(url, jwt_secret = jwt_secret, session = session)
+
+# ############################################################################ #
+# New Heads Subscription
+
+class NewHeadsSubscription:
+    """
+    A subscription to newHeads notifications on the WebSocket API of an EVM
+    node (port 8546). It is used to wake up waiters as soon as the head of the
+    chain changes instead of waiting for a fixed delay.
+    """
+
+    def __init__(self, url: Url, session: aiohttp.ClientSession|None = None):
+        self.url = url
+        self.session = session
+        self.head: dict|None = None
+        self.count = 0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task|None = None
+
+    def start(self):
+        "Start the subscription in the background. Reconnects on failures."
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                session = self.session or get_async_pool()
+                async with session.ws_connect(self.url) as ws:
+                    await ws.send_json({
+                        "jsonrpc": "2.0",
+                        "method": "eth_subscribe",
+                        "params": ["newHeads"],
+                        "id": 1,
+                    })
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        j = msg.json()
+                        if j.get("method") == "eth_subscription":
+                            self._notify(j["params"]["result"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("newHeads subscription to %s failed: %s", self.url, e)
+            await asyncio.sleep(1)
+
+    def _notify(self, head: dict):
+        self.head = head
+        self.count += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """
+        Wait until a new head is received after the head count `since`, or until
+        the timeout expires. Returns whether a new head was received.
+        """
+        if self.count != since:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
 # ############################################################################ #
 # Engine Client
 
-class EngineClient(EngineRPC):
-    "An engine client with async methods"
+# Fork choice updates are retried while the node is syncing until it is done.
+DEFAULT_SYNC_BACKOFF = Backoff(initial=0.05, max_delay=0.5)
+
+# Payloads are usually ready right away. Give up after the same 10 seconds as
+# the previous fixed retry loop.
+DEFAULT_PAYLOAD_BACKOFF = Backoff(initial=0.01, max_delay=1.0, deadline=10)
+
+class EngineTimeoutException(RpcException):
+    "Raised when the engine does not reach the expected state before the deadline"
+
+class EngineClient(AsyncEngineRPC):
+    """
+    An engine client with async methods
+
+    Retries use exponential backoff. If a WebSocket URL is given, waiting
+    between retries also ends as soon as the engine reports a new head.
+    """
+
+    def __init__(
+        self,
+        url: Url,
+        jwt_secret: HexString,
+        session: aiohttp.ClientSession|None = None,
+        *,
+        sync_backoff: Backoff = DEFAULT_SYNC_BACKOFF,
+        payload_backoff: Backoff = DEFAULT_PAYLOAD_BACKOFF,
+        ws_url: Url|None = None,
+    ):
+        super().__init__(url, jwt_secret, session=session)
+        self.sync_backoff = sync_backoff
+        self.payload_backoff = payload_backoff
+        self.heads = NewHeadsSubscription(ws_url, session=session) if ws_url is not None else None
+
+    def _head_count(self) -> int:
+        if self.heads is None:
+            return 0
+        self.heads.start()
+        return self.heads.count
+
+    async def _pause(self, since: int, delay: float):
+        "Wait for the given delay or until a new head is received"
+        if self.heads is None:
+            await asyncio.sleep(delay)
+        else:
+            await self.heads.wait(since, delay)
+
+    async def close(self):
+        if self.heads is not None:
+            await self.heads.close()
+        await super().close()
 
     async def sync(
         self,
@@ -144,16 +284,19 @@ class EngineClient(EngineRPC):
         """
         Submit fork choice for the given head block hash without building a new block.
         """
+        delays = self.sync_backoff.delays()
         while True:
+            seen = self._head_count()
 
             # new fork choice state
             params = fork_sync_params(fork_choice_state)
             try:
-                build = self.engine_forkchoiceUpdatedV3(params)
+                build = await self.engine_forkchoiceUpdatedV3(params)
             except RpcErrorException as e:
                 logger.error("Failed to sync: %s", e.error)
                 if e.error.get("code") == -38002:
                     raise InvalidForkChoiceStateException(params) from e
+                raise
             logger.debug(json.dumps(build, indent=2))
             status = build["payloadStatus"].get("status")
             logger.info("fork choice status: %s", status)
@@ -163,10 +306,13 @@ class EngineClient(EngineRPC):
                 case "INVALID":
                     raise InvalidPayloadStatusException("Fork choice failed: INVALID payload Status")
                 case "SYNCING":
-                    logger.info("Fork choice pending (sleeping for 0.5s)")
-                    await asyncio.sleep(0.5)
+                    delay = next(delays, None)
+                    if delay is None:
+                        raise EngineTimeoutException("Fork choice still SYNCING at deadline")
+                    logger.info("Fork choice pending (retrying in %.3fs)", delay)
+                    await self._pause(seen, delay)
                 case _:
-                    raise InvalidPayloadStatusException("Unexpected RPC status: {status}")
+                    raise InvalidPayloadStatusException(f"Unexpected RPC status: {status}")
 
     async def wait_for_fork(
         self,
@@ -177,13 +323,15 @@ class EngineClient(EngineRPC):
         """
         Submit fork choice for the given head block hash and await a payload job id.
         """
+        delays = self.sync_backoff.delays()
         while True:
+            seen = self._head_count()
             params = fork_choice_update_params(
                 fork_choice_state,
                 cur_beacon_block_root,
                 miner_address
             )
-            build = self.engine_forkchoiceUpdatedV3(params)
+            build = await self.engine_forkchoiceUpdatedV3(params)
             logger.debug(json.dumps(build, indent=2))
             status = build.get("payloadStatus").get("status")
             logger.info("fork choice status: %s", status)
@@ -196,10 +344,13 @@ class EngineClient(EngineRPC):
                 case "INVALID":
                     raise InvalidPayloadStatusException("Fork choice failed: INVALID")
                 case "SYNCING":
-                    logger.info("Fork choice pending (sleeping for 0.5s)")
-                    await asyncio.sleep(0.5)
+                    delay = next(delays, None)
+                    if delay is None:
+                        raise EngineTimeoutException("Fork choice still SYNCING at deadline")
+                    logger.info("Fork choice pending (retrying in %.3fs)", delay)
+                    await self._pause(seen, delay)
                 case _:
-                    raise InvalidPayloadStatusException("Unexpected RPC status: {status}")
+                    raise InvalidPayloadStatusException(f"Unexpected RPC status: {status}")
 
     async def wait_for_payload(self, payload_id):
         """
@@ -207,26 +358,207 @@ class EngineClient(EngineRPC):
         """
         if payload_id is None:
             raise ValueError("Payload id must not be None")
-        for i in range(10):
+        start = time.monotonic()
+        delays = self.payload_backoff.delays()
+        while True:
+            seen = self._head_count()
             try:
-                r = self.engine_getPayloadV3(payload_id)
+                r = await self.engine_getPayloadV3(payload_id)
                 logger.debug(json.dumps(r, indent=2))
                 logger.info("got execution payload for: %s", payload_id)
                 return r.get("executionPayload")
             except RpcException:
-                logger.warning("Waiting for payload after %d seconds -- retrying", i + 1)
-                await asyncio.sleep(1)
-        raise GetPayloadException(f"Finally failed to get payload after {i+1} seconds")
+                delay = next(delays, None)
+                if delay is None:
+                    break
+                logger.warning("Waiting for payload after %.3f seconds -- retrying", time.monotonic() - start)
+                await self._pause(seen, delay)
+        raise GetPayloadException(f"Finally failed to get payload after {time.monotonic() - start:.3f} seconds")
 
     async def wait_for_node(self):
+        delays = self.sync_backoff.delays()
         while True:
             try:
-                self.eth_chainId()
+                await self.eth_chainId()
                 logger.info('Node is ready')
                 break
-            except requests.Timeout:
+            except asyncio.TimeoutError:
                 logger.info("Waiting for node... (timeout)")
-                time.sleep(1)
-            except requests.ConnectionError:
+            except (aiohttp.ClientConnectionError, RpcCircuitOpenException):
                 logger.warning("Waiting for node... (connection error)")
-                await asyncio.sleep(1)
+            delay = next(delays, None)
+            if delay is None:
+                raise EngineTimeoutException("Node is not ready at deadline")
+            await asyncio.sleep(delay)
+
+# ############################################################################ #
+# Multi-Chain Engine Client
+#
+# A devnet node runs one EVM engine per EVM chain, and a project may run
+# several nodes. The engine endpoints are taken from the payload provider
+# configuration files that compose.py writes for each node.
+
+# An engine is identified by the node name and the chain id
+type EngineKey = tuple[str, int]
+
+type EngineEndpoint = tuple[Url, HexString]
+
+def payload_provider_endpoints(config_file: str) -> dict[int, EngineEndpoint]:
+    """
+    Get the EVM engine endpoints of a node from its payload-providers.yaml
+    configuration file. Returns a dictionary from chain id to engine URL and
+    JWT secret.
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    providers = config["chainweb"]["payloadProviders"]
+    return {
+        int(k.removeprefix("chain-")): (v["engineUri"], v["engineJwtSecret"])
+        for k, v in providers.items()
+        if v.get("type") == "evm"
+    }
+
+def project_engine_endpoints(project_config_dir: str) -> dict[EngineKey, EngineEndpoint]:
+    """
+    Get the EVM engine endpoints of all nodes of a project from the node
+    configuration directories, e.g. `./config/kadena-dev`.
+    """
+    result: dict[EngineKey, EngineEndpoint] = {}
+    for config_file in sorted(glob.glob(f"{project_config_dir}/*/payload-providers.yaml")):
+        node = os.path.basename(os.path.dirname(config_file))
+        for cid, endpoint in payload_provider_endpoints(config_file).items():
+            result[(node, cid)] = endpoint
+    return result
+
+def engine_ws_url(engine_url: Url, ws_port: int = 8546) -> Url:
+    "Get the WebSocket URL of the EVM node that serves the given engine URL"
+    host = engine_url.split("://", 1)[-1].split("/", 1)[0].rsplit(":", 1)[0]
+    return f"ws://{host}:{ws_port}"
+
+@dataclass
+class EngineResult:
+    "The outcome of a call to a single engine"
+    key: EngineKey
+    result: Any = None
+    error: Exception|None = None
+    latency: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class MultiEngineClient:
+    """
+    Drives the engines of many chains and nodes concurrently. At most
+    `max_concurrency` calls are in flight at any time.
+
+    Calls return a dictionary from engine key to EngineResult. A failing engine
+    does not fail the other engines; its exception is stored in the result.
+
+    If `subscribe_heads` is set, each client subscribes to newHeads on the
+    WebSocket port of its EVM node. Other keyword arguments are passed to the
+    EngineClient constructor.
+    """
+
+    def __init__(
+        self,
+        endpoints: dict[EngineKey, EngineEndpoint],
+        max_concurrency: int = 16,
+        session: aiohttp.ClientSession|None = None,
+        subscribe_heads: bool = False,
+        **client_kwargs,
+    ):
+        self.clients = {
+            key: EngineClient(
+                url,
+                jwt_secret,
+                session=session,
+                ws_url=engine_ws_url(url) if subscribe_heads else None,
+                **client_kwargs,
+            )
+            for key, (url, jwt_secret) in endpoints.items()
+        }
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_project(cls, project_config_dir: str, **kwargs) -> "MultiEngineClient":
+        "Create a client for all engines of a project"
+        return cls(project_engine_endpoints(project_config_dir), **kwargs)
+
+    @property
+    def keys(self) -> list[EngineKey]:
+        return list(self.clients.keys())
+
+    async def _run(
+        self,
+        key: EngineKey,
+        f: Callable[[EngineClient], Awaitable[Any]],
+    ) -> EngineResult:
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                r = await f(self.clients[key])
+                return EngineResult(key, result=r, latency=time.perf_counter() - start)
+            except Exception as e:
+                logger.warning("engine %s-evm-%d failed: %s", key[0], key[1], e)
+                return EngineResult(key, error=e, latency=time.perf_counter() - start)
+
+    async def map(
+        self,
+        f: Callable[[EngineClient, EngineKey], Awaitable[Any]],
+        keys: list[EngineKey]|None = None,
+    ) -> dict[EngineKey, EngineResult]:
+        "Run an action on the engines with the given keys (default: all engines)"
+        keys = self.keys if keys is None else keys
+        results = await asyncio.gather(
+            *[self._run(k, lambda c, k=k: f(c, k)) for k in keys]
+        )
+        return {r.key: r for r in results}
+
+    async def engine_forkchoiceUpdatedV3(
+        self,
+        params: dict[EngineKey, ForkChoiceParams],
+    ) -> dict[EngineKey, EngineResult]:
+        "Call engine_forkchoiceUpdatedV3 on each engine with its params"
+        return await self.map(
+            lambda c, k: c.engine_forkchoiceUpdatedV3(params[k]),
+            list(params.keys()),
+        )
+
+    async def engine_getPayloadV3(
+        self,
+        payload_ids: dict[EngineKey, PayloadId],
+    ) -> dict[EngineKey, EngineResult]:
+        "Call engine_getPayloadV3 on each engine with its payload id"
+        return await self.map(
+            lambda c, k: c.engine_getPayloadV3(payload_ids[k]),
+            list(payload_ids.keys()),
+        )
+
+    async def sync(
+        self,
+        states: dict[EngineKey, ForkChoiceState],
+    ) -> dict[EngineKey, EngineResult]:
+        "Sync each engine to its fork choice state"
+        return await self.map(lambda c, k: c.sync(states[k]), list(states.keys()))
+
+    async def wait_for_payloads(
+        self,
+        payload_ids: dict[EngineKey, PayloadId],
+    ) -> dict[EngineKey, EngineResult]:
+        "Await the payloads for the given payload build ids"
+        return await self.map(
+            lambda c, k: c.wait_for_payload(payload_ids[k]),
+            list(payload_ids.keys()),
+        )
+
+    async def close(self):
+        for c in self.clients.values():
+            await c.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
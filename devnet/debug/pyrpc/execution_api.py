@@ -1,23 +1,35 @@
 import asyncio
-import time
-import requests
+import aiohttp
 import logging
+import threading
 
 # local modules
-from rpc import RPC, RpcException
+from rpc import RPC, AsyncRPC, CallPolicy, RpcException, RpcCircuitOpenException, Url
 from ethtypes import BlockHash, BlockSpec, Address
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of calls that are sent in a single JSON-RPC batch
+DEFAULT_BATCH_SIZE = 100
+
+def block_param(block_spec: BlockSpec) -> str:
+    "Encode a block number as hex string. Tags and hex strings are returned as is."
+    if isinstance(block_spec, int):
+        return hex(max(block_spec, 0))
+    return block_spec
+
 # ############################################################################ #
 # Ethereum JSON-RPC
+#
+# The methods are shared by the synchronous and the asynchronous clients. With
+# an asynchronous client they return awaitables of the results.
 
-class CommonEthRPC(RPC):
+class CommonEthMethods:
     "Ethereum RPC methods that are also exposed by the Engine"
 
-    def eth_blockNumber(self) -> int:
+    def eth_blockNumber(self):
         "Returns the latest block number of the blockchain"
-        return int(self.rpc("eth_blockNumber"), 16)
+        return self._map(self.rpc("eth_blockNumber"), lambda n: int(n, 16))
 
     def eth_call(self, tx, block_spec: BlockSpec = "latest", state = None):
         "Executes a new message call immediately without creating a transaction on the block chain"
@@ -43,13 +55,22 @@ class CommonEthRPC(RPC):
         - number: int|str - block numbe as integer or hex string, or the
             string "earliest", "latest", "safe", "finalized", or "pending".
         """
-        if isinstance(block_spec, int):
-            block_spec = hex(max(block_spec, 0))
-        return self.rpc("eth_getBlockByNumber", [block_spec, False])
+        return self.rpc("eth_getBlockByNumber", [block_param(block_spec), False])
+
+    def get_blocks_by_number(self, block_specs: list[BlockSpec], batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Returns the blocks matching the given block numbers. The blocks are
+        requested in JSON-RPC batches of at most `batch_size` calls.
+        """
+        batches = [
+            self.batch([("eth_getBlockByNumber", [block_param(b), False]) for b in block_specs[i:i + batch_size]])
+            for i in range(0, len(block_specs), batch_size)
+        ]
+        return self._map(self._batch_results(batches), lambda rs: [r for batch in rs for r in batch])
 
-    def eth_getLogs(self, log_filter):
+    def eth_getLogs(self, log_filter, policy: CallPolicy|None = None):
         "Returns an array of all logs matching a given filter object"
-        return self.rpc("eth_getLogs", [log_filter])
+        return self.rpc("eth_getLogs", [log_filter], policy=policy)
 
     def eth_sendRawTransaction(self, tx):
         "Creates new message call transaction or a contract creation for signed transactions"
@@ -60,16 +81,20 @@ class CommonEthRPC(RPC):
         return self.rpc("eth_syncing")
 
 # eth
-class EthRPC(CommonEthRPC):
-    "Ethereum JSON-RPC client"
+class EthMethods(CommonEthMethods):
+    "Ethereum JSON-RPC methods"
 
     # eth methods
-    # inherited from CommonEthRPC
+    # inherited from CommonEthMethods
 
     def eth_getTransactionReceipt(self, block_hash: BlockHash):
         "Returns the transaction receipt for a particular transaction hash"
         return self.rpc("eth_getTransactionReceipt", [block_hash])
 
+    def eth_getBlockReceipts(self, block_spec: BlockSpec):
+        "Returns the receipts of all transactions of the given block"
+        return self.rpc("eth_getBlockReceipts", [block_param(block_spec)])
+
     def eth_getTransactionByBlockNumberAndIndex(self, block_number:int, index:int):
         "Returns the transaction receipt for a particular transaction hash"
         return self.rpc("eth_getTransactionByBlockNumberAndIndex", [block_number, index])
@@ -135,6 +160,23 @@ class EthRPC(CommonEthRPC):
     def debug_traceBlockByNumber(self, block: BlockSpec):
         return self.rpc("debug_traceBlock", [block])
 
+class CommonEthRPC(CommonEthMethods, RPC):
+    "Ethereum RPC methods that are also exposed by the Engine"
+
+class EthRPC(EthMethods, RPC):
+    "Ethereum JSON-RPC client"
+
+class ThreadLocalClient(threading.local):
+    "An EthRPC client for each thread that uses it. The clients share the connection pool."
+    def __init__(self, url: Url):
+        self.client = EthRPC(url)
+
+class AsyncCommonEthRPC(CommonEthMethods, AsyncRPC):
+    "Asynchronous Ethereum RPC methods that are also exposed by the Engine"
+
+class AsyncEthRPC(EthMethods, AsyncRPC):
+    "Asynchronous Ethereum JSON-RPC client"
+
 # ############################################################################ #
 # Asynchronous Actions
 
@@ -147,16 +189,16 @@ class InvalidForkChoiceStateException(RpcException):
 class GetPayloadException(RpcException):
     pass
 
-class EthClient(EthRPC):
+class EthClient(AsyncEthRPC):
     async def wait_for_node(self):
         while True:
             try:
-                self.admin_nodeInfo()
+                await self.admin_nodeInfo()
                 logger.info('Node is ready')
                 break
-            except requests.Timeout:
+            except asyncio.TimeoutError:
                 logger.info("Waiting for node... (timeout)")
-                time.sleep(1)
-            except requests.ConnectionError:
+                await asyncio.sleep(1)
+            except (aiohttp.ClientConnectionError, RpcCircuitOpenException):
                 logger.warning("Waiting for node... (connection error)")
                 await asyncio.sleep(1)
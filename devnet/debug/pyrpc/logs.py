@@ -0,0 +1,142 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import logging
+import sys
+import time
+from dataclasses import replace
+from typing import Iterator
+
+import requests
+
+# local modules
+from rpc import DEFAULT_POLICY, METHOD_POLICIES, RpcCircuitOpenException, RpcErrorException, RpcHttpStatusException, Url, get_breaker
+from execution_api import EthRPC, ThreadLocalClient, block_param
+from ethtypes import BlockNumber
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_RANGE = 1000
+DEFAULT_MAX_RANGE = 100000
+
+# Ranges that are answered faster than this number of seconds are grown
+DEFAULT_TARGET_LATENCY = 0.25
+
+DEFAULT_WORKERS = 4
+
+# Failed ranges are split instead of retried, so each call is attempted once
+GET_LOGS_POLICY = replace(METHOD_POLICIES.get("eth_getLogs", DEFAULT_POLICY), retries=0)
+
+# ############################################################################ #
+# Log Scanner
+
+class LogScanner:
+    """
+    Scans the logs of a range of blocks with eth_getLogs.
+
+    The block range is split into sub-ranges that are queried concurrently by
+    a pool of worker threads. The size of new sub-ranges adapts to the node: a
+    sub-range that fails, times out or loses its connection is split in halves
+    and the size is halved, and the size is doubled after responses that are
+    faster than `target_latency`. Sizes at which a sub-range failed are not
+    tried again. Sub-ranges that are rejected by an open circuit breaker are
+    retried after the breaker resets. Logs are yielded in block order.
+    """
+
+    def __init__(
+        self,
+        url: Url,
+        initial_range: int = DEFAULT_INITIAL_RANGE,
+        max_range: int = DEFAULT_MAX_RANGE,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        self.url = url
+        self.range_size = min(initial_range, max_range)
+        self.max_range = max_range
+        self.target_latency = target_latency
+        self.workers = workers
+        self._local = ThreadLocalClient(url)
+
+    @property
+    def client(self) -> EthRPC:
+        "The client of the current worker thread"
+        return self._local.client
+
+    def get_logs(self, log_filter: dict, start: BlockNumber, end: BlockNumber) -> tuple[list, float]:
+        "Get the logs of the inclusive range [start, end] and the latency of the call"
+        f = log_filter | {"fromBlock": block_param(start), "toBlock": block_param(end)}
+        t = time.monotonic()
+        logs = self.client.eth_getLogs(f, policy=GET_LOGS_POLICY)
+        return logs, time.monotonic() - t
+
+    def iter_logs(self, log_filter: dict, start: BlockNumber, end: BlockNumber) -> Iterator[dict]:
+        "Yield the logs that match the filter in the inclusive block range [start, end]"
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # pending ranges in block order
+            pending: collections.deque[tuple[BlockNumber, BlockNumber, concurrent.futures.Future]] = collections.deque()
+            cursor = start
+
+            def submit(a, b):
+                return (a, b, pool.submit(self.get_logs, log_filter, a, b))
+
+            while pending or cursor <= end:
+                while cursor <= end and len(pending) < self.workers:
+                    b = min(cursor + self.range_size - 1, end)
+                    pending.append(submit(cursor, b))
+                    cursor = b + 1
+
+                a, b, fut = pending.popleft()
+                try:
+                    logs, latency = fut.result()
+                except RpcCircuitOpenException:
+                    # Calls to the node are suspended after failures of other
+                    # ranges. Retry the range once the circuit can close.
+                    time.sleep(get_breaker(self.url).reset_after)
+                    pending.appendleft(submit(a, b))
+                    continue
+                except (
+                    RpcErrorException,
+                    RpcHttpStatusException,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError,
+                ) as e:
+                    if a == b:
+                        raise
+                    mid = (a + b) // 2
+                    self.max_range = max(1, min(self.max_range, b - a))
+                    self.range_size = max(1, min(self.range_size, b - a + 1) // 2)
+                    logger.info("eth_getLogs failed for blocks %d-%d, new range size %d: %s", a, b, self.range_size, e)
+                    pending.appendleft(submit(mid + 1, b))
+                    pending.appendleft(submit(a, mid))
+                    continue
+
+                if latency < self.target_latency:
+                    self.range_size = min(self.range_size * 2, self.max_range)
+                yield from logs
+
+def iter_logs(url: Url, log_filter: dict, start: BlockNumber, end: BlockNumber, **kwargs) -> Iterator[dict]:
+    "Yield the logs that match the filter in the inclusive block range [start, end]"
+    return LogScanner(url, **kwargs).iter_logs(log_filter, start, end)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the logs of a range of blocks as NDJSON")
+    parser.add_argument("url", help="URL of the EVM node, e.g. http://bootnode-evm-20:8545")
+    parser.add_argument("start", type=int)
+    parser.add_argument("end", nargs="?", help="last block, default latest")
+    parser.add_argument("--address", help="contract address")
+    parser.add_argument("--topics", help="JSON array of topics")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    log_filter = {}
+    if args.address is not None:
+        log_filter["address"] = args.address
+    if args.topics is not None:
+        log_filter["topics"] = json.loads(args.topics)
+
+    scanner = LogScanner(args.url, workers=args.workers)
+    end = int(args.end) if args.end is not None else scanner.client.eth_blockNumber()
+    for log in scanner.iter_logs(log_filter, args.start, end):
+        sys.stdout.write(json.dumps(log) + "\n")
@@ -0,0 +1,174 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import logging
+import sys
+import time
+from typing import Iterable, Iterator, TextIO
+
+import requests
+
+# local modules
+from rpc import RpcCircuitOpenException, RpcErrorException, Url, get_breaker
+from execution_api import EthRPC, DEFAULT_BATCH_SIZE, ThreadLocalClient, block_param
+from ethtypes import BlockNumber
+
+logger = logging.getLogger(__name__)
+
+# Number of blocks that are scanned by a single worker task
+DEFAULT_RANGE_SIZE = 1000
+
+DEFAULT_WORKERS = 8
+
+# JSON-RPC error code for unsupported methods
+METHOD_NOT_FOUND = -32601
+
+# ############################################################################ #
+# Receipt Scanner
+
+type BlockReceipts = tuple[BlockNumber, list]
+
+def split_range(start: BlockNumber, end: BlockNumber, size: int) -> list[tuple[BlockNumber, BlockNumber]]:
+    "Split the inclusive block range [start, end] into ranges of at most `size` blocks"
+    return [(i, min(i + size - 1, end)) for i in range(start, end + 1, size)]
+
+class ReceiptScanner:
+    """
+    Scans the receipts of a range of blocks.
+
+    The range is split into sub-ranges that are scanned concurrently by a pool
+    of worker threads. Each worker requests the receipts of `batch_size` blocks
+    per JSON-RPC batch. Results are yielded in block order.
+
+    If the node does not support `eth_getBlockReceipts`, the receipts are
+    requested for each transaction of the block.
+    """
+
+    def __init__(
+        self,
+        url: Url,
+        range_size: int = DEFAULT_RANGE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        self.url = url
+        self.range_size = range_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.block_receipts = True
+        self._local = ThreadLocalClient(url)
+
+    @property
+    def client(self) -> EthRPC:
+        "The client of the current worker thread"
+        return self._local.client
+
+    def _batch(self, method: str, params: list[list]) -> list:
+        """
+        Send calls in a single batch. If the batch times out it is split in
+        halves until single calls time out. If calls to the node are suspended
+        by the circuit breaker, the batch is sent again after the breaker
+        resets.
+        """
+        try:
+            return self.client.batch([(method, p) for p in params]).results()
+        except RpcCircuitOpenException:
+            time.sleep(get_breaker(self.url).reset_after)
+            return self._batch(method, params)
+        except requests.exceptions.Timeout:
+            if len(params) <= 1:
+                raise
+            mid = len(params) // 2
+            return self._batch(method, params[:mid]) + self._batch(method, params[mid:])
+
+    def _receipts_by_tx(self, numbers: list[BlockNumber]) -> list[list]:
+        """
+        Get receipts by transaction hash for nodes without eth_getBlockReceipts.
+        Blocks that do not exist, e.g. above the head of the chain, have no
+        receipts.
+        """
+        blocks = self._batch("eth_getBlockByNumber", [[block_param(n), False] for n in numbers])
+        blocks = [b or {"transactions": []} for b in blocks]
+        hashes = [tx for b in blocks for tx in b["transactions"]]
+        receipts = iter(self._batch("eth_getTransactionReceipt", [[h] for h in hashes]))
+        return [[next(receipts) for _ in b["transactions"]] for b in blocks]
+
+    def _receipts(self, numbers: list[BlockNumber]) -> list[list]:
+        if self.block_receipts:
+            try:
+                rs = self._batch("eth_getBlockReceipts", [[block_param(n)] for n in numbers])
+                return [r or [] for r in rs]
+            except RpcErrorException as e:
+                if not isinstance(e.error, dict) or e.error.get("code") != METHOD_NOT_FOUND:
+                    raise
+                logger.info("eth_getBlockReceipts is not supported, using eth_getTransactionReceipt")
+                self.block_receipts = False
+        return self._receipts_by_tx(numbers)
+
+    def scan_range(self, start: BlockNumber, end: BlockNumber) -> list[BlockReceipts]:
+        "Get the receipts of all blocks in the inclusive range [start, end]"
+        result = []
+        for a, b in split_range(start, end, self.batch_size):
+            numbers = list(range(a, b + 1))
+            result += zip(numbers, self._receipts(numbers))
+        return result
+
+    def scan(self, start: BlockNumber, end: BlockNumber) -> Iterator[list[BlockReceipts]]:
+        """
+        Scan the receipts of the blocks in the inclusive range [start, end].
+        Yields the results of each sub-range in block order. At most twice as
+        many sub-ranges as there are workers are pending at any time.
+        """
+        ranges = iter(split_range(start, end, self.range_size))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = collections.deque()
+            for r in ranges:
+                pending.append(pool.submit(self.scan_range, *r))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+# ############################################################################ #
+# Output
+
+def columns(chunk: list[BlockReceipts]) -> dict[str, list]:
+    "Arrange the receipts of a chunk of blocks by field"
+    receipts = [r for _, rs in chunk for r in rs]
+    keys = list(dict.fromkeys(k for r in receipts for k in r))
+    return {k: [r.get(k) for r in receipts] for k in keys}
+
+def write_ndjson(chunks: Iterable[list[BlockReceipts]], out: TextIO = sys.stdout):
+    "Write one JSON object per block"
+    for chunk in chunks:
+        for n, rs in chunk:
+            out.write(json.dumps({"blockNumber": n, "receipts": rs}) + "\n")
+        out.flush()
+
+def write_columns(chunks: Iterable[list[BlockReceipts]], out: TextIO = sys.stdout):
+    "Write one JSON object with the receipts arranged by field per chunk"
+    for chunk in chunks:
+        if chunk:
+            r = {"from": chunk[0][0], "to": chunk[-1][0], "columns": columns(chunk)}
+            out.write(json.dumps(r) + "\n")
+            out.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan the receipts of a range of blocks")
+    parser.add_argument("url", help="URL of the EVM node, e.g. http://bootnode-evm-20:8545")
+    parser.add_argument("start", type=int)
+    parser.add_argument("end", nargs="?", help="last block, default latest")
+    parser.add_argument("--range-size", type=int, default=DEFAULT_RANGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--format", choices=["ndjson", "columns"], default="ndjson")
+    args = parser.parse_args()
+
+    scanner = ReceiptScanner(args.url, args.range_size, args.batch_size, args.workers)
+    end = int(args.end) if args.end is not None else scanner.client.eth_blockNumber()
+    chunks = scanner.scan(args.start, end)
+    if args.format == "columns":
+        write_columns(chunks)
+    else:
+        write_ndjson(chunks)
@@ -1,6 +1,16 @@
+import functools
+import json
 import os
+import random
+import threading
 import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Iterator
+import aiohttp
+import asyncio
 import requests
+import requests.adapters
+import urllib3.exceptions
 import jwt
 
 # ############################################################################ #
@@ -26,6 +36,9 @@ class RpcErrorException(RpcException):
         super().__init__(f"RPC error: {error}")
         self.error = error
 
+class RpcCircuitOpenException(RpcException):
+    "An exception raised when calls to a URL are suspended after repeated failures"
+
 # ############################################################################ #
 # JWT Token
 
@@ -35,62 +48,417 @@ def get_jwt_secret(jwt_secret_path: str|None = None, jwt_secret_var: str = 'JWT_
     if jwt_secret is None:
         if jwt_secret_path is None:
             raise ValueError("No JWT secret path or environment variable provided")
-        with open(file=jwt_secret_path, mode="r", encoding="utf-8") as f:
-            jwt_secret = f.read().strip()
+        jwt_secret = read_jwt_secret(jwt_secret_path)
     return jwt_secret
 
+@functools.cache
+def read_jwt_secret(jwt_secret_path: str) -> str:
+    "Read a JWT secret from a file. The result is cached for each path."
+    with open(file=jwt_secret_path, mode="r", encoding="utf-8") as f:
+        return f.read().strip()
+
 def get_token(jwt_secret_path):
     "Get a JWT token from the given path or environment variable"
     return mk_token(get_jwt_secret(jwt_secret_path))
 
-def mk_token(secret):
+def decode_jwt_secret(secret: str|bytes) -> bytes:
+    "Decode a hex encoded JWT secret. Bytes are returned as is."
+    if isinstance(secret, bytes):
+        return secret
+    return bytes.fromhex(secret.removeprefix("0x"))
+
+def mk_token(secret: str|bytes, iat: int|None = None):
     "Create a JWT token from the given secret"
     algorithm = "HS256"
-    secret_bytes_obj = bytes.fromhex(secret)
+    secret_bytes_obj = decode_jwt_secret(secret)
     payload = {
-        "iat": int(time.time()),
+        "iat": int(time.time()) if iat is None else iat,
         # "iss": os.environ.get("JWT_PASSWORD"),
     }
     token = jwt.encode(payload, secret_bytes_obj, algorithm=algorithm)
     # print(f"{token}")
     return token
 
+# The engine API rejects tokens with an "iat" claim that is more than 60
+# seconds away from the current time of the node. Cached tokens are re-minted
+# when they reach half of that age, which leaves room for clock drift between
+# the client and the node.
+JWT_IAT_WINDOW = 60
+DEFAULT_TOKEN_REFRESH = JWT_IAT_WINDOW // 2
+
+class TokenCache:
+    """
+    A JWT token that is reused until it gets close to the end of the engine
+    API's iat window.
+
+    Refreshing is guarded by a lock and never awaits, so the cache can be
+    shared by threads and by asyncio tasks.
+    """
+
+    def __init__(self, secret: str|bytes, refresh_after: int = DEFAULT_TOKEN_REFRESH):
+        if refresh_after >= JWT_IAT_WINDOW:
+            raise ValueError(f"refresh_after must be less than {JWT_IAT_WINDOW} seconds")
+        self.secret = decode_jwt_secret(secret)
+        self.refresh_after = refresh_after
+        self._cached: tuple[JwtToken, int]|None = None
+        self._lock = threading.Lock()
+
+    def _fresh(self, cached: tuple[JwtToken, int]|None, now: int) -> bool:
+        return cached is not None and now - cached[1] < self.refresh_after
+
+    def get(self) -> JwtToken:
+        "Get a valid token, minting a new one if the cached token is too old"
+        now = int(time.time())
+        cached = self._cached
+        if self._fresh(cached, now):
+            return cached[0]
+        with self._lock:
+            # another thread may have refreshed the token in the meantime
+            cached = self._cached
+            if not self._fresh(cached, now):
+                cached = (mk_token(self.secret, iat=now), now)
+                self._cached = cached
+            return cached[0]
+
+# ############################################################################ #
+# Backoff
+
+@dataclass(frozen=True)
+class Backoff:
+    "Exponential backoff with jitter and an optional total deadline"
+
+    # delay before the first retry in seconds
+    initial: float = 0.05
+
+    # growth factor of the delay after each retry
+    factor: float = 2.0
+
+    # upper bound of the delay in seconds
+    max_delay: float = 1.0
+
+    # relative random deviation of each delay, e.g. 0.2 for +/-20%
+    jitter: float = 0.2
+
+    # total time in seconds after which no more delays are produced
+    deadline: float|None = None
+
+    def delays(self) -> Iterator[float]:
+        """
+        Yield the delays between retries. The iterator ends when the deadline
+        is reached. The deadline starts when the first delay is requested.
+        """
+        start = time.monotonic()
+        total = 0.0
+        delay = self.initial
+        while True:
+            d = delay * (1 + random.uniform(-self.jitter, self.jitter))
+            if self.deadline is not None:
+                # the yielded delays count even if the caller did not wait
+                elapsed = max(time.monotonic() - start, total)
+                remaining = self.deadline - elapsed
+                if remaining <= 0:
+                    return
+                d = min(d, remaining)
+            total += d
+            yield d
+            delay = min(delay * self.factor, self.max_delay)
+
+# ############################################################################ #
+# Call Policy
+
+@dataclass(frozen=True)
+class CallPolicy:
+    "Timeouts and retries of an RPC call"
+
+    # timeout in seconds for establishing a connection
+    connect_timeout: float = 0.5
+
+    # timeout in seconds for reading the response
+    read_timeout: float = 1.0
+
+    # number of retries after connection errors and timeouts
+    retries: int = 2
+
+    # delays between retries
+    backoff: Backoff = field(default_factory=lambda: Backoff(initial=0.05, max_delay=0.5))
+
+    # Whether the call can be repeated without side effects. Calls that are
+    # not idempotent are only retried if the request was not sent.
+    idempotent: bool = True
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def combine(self, other: "CallPolicy") -> "CallPolicy":
+        "A policy for a batch that contains calls of both policies"
+        return replace(
+            self,
+            connect_timeout=max(self.connect_timeout, other.connect_timeout),
+            read_timeout=max(self.read_timeout, other.read_timeout),
+            retries=min(self.retries, other.retries),
+            idempotent=self.idempotent and other.idempotent,
+        )
+
+DEFAULT_POLICY = CallPolicy()
+
+# Per-method defaults. Methods that are not listed use DEFAULT_POLICY.
+METHOD_POLICIES: dict[Method, CallPolicy] = {
+    # cheap calls
+    "eth_chainId": CallPolicy(read_timeout=0.25),
+    "eth_blockNumber": CallPolicy(read_timeout=0.25),
+    "net_version": CallPolicy(read_timeout=0.25),
+    # heavy calls
+    "eth_call": CallPolicy(read_timeout=5),
+    "eth_getLogs": CallPolicy(read_timeout=10, retries=0),
+    "eth_getBlockReceipts": CallPolicy(read_timeout=5),
+    "debug_traceChain": CallPolicy(read_timeout=120, retries=0),
+    "debug_traceBlock": CallPolicy(read_timeout=60, retries=1),
+    "debug_traceTransaction": CallPolicy(read_timeout=60, retries=1),
+    # calls with side effects
+    "eth_sendRawTransaction": CallPolicy(read_timeout=2, idempotent=False),
+    "engine_forkchoiceUpdatedV3": CallPolicy(idempotent=False),
+}
+
+# ############################################################################ #
+# Circuit Breaker
+
+class CircuitBreaker:
+    """
+    Suspends calls to a URL after `threshold` consecutive connection failures
+    or connect timeouts. Read timeouts do not count, because slow calls on a
+    loaded node are not failures of the node. After `reset_after` seconds a
+    single trial call is let through, which closes the circuit again if it
+    succeeds.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 2.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: float|None = None
+        self._lock = threading.Lock()
+
+    def check(self, url: Url):
+        "Raise RpcCircuitOpenException if calls to the URL are suspended"
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_after:
+                raise RpcCircuitOpenException(f"Calls to {url} are suspended after {self.failures} failures")
+            # half open: let one trial call through
+            self.opened_at = time.monotonic()
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+_breakers: dict[Url, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(url: Url) -> CircuitBreaker:
+    "Get the circuit breaker of a URL. Breakers are shared by all clients."
+    with _breakers_lock:
+        if url not in _breakers:
+            _breakers[url] = CircuitBreaker()
+        return _breakers[url]
+
+def _not_sent(e: Exception) -> bool:
+    "Whether a request failed before it was sent"
+    if isinstance(e, (requests.exceptions.ConnectTimeout, aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and e.args:
+        return isinstance(getattr(e.args[0], "reason", None), urllib3.exceptions.NewConnectionError)
+    return False
+
+def _node_failure(e: Exception) -> bool:
+    "Whether an error counts as a failure of the node for the circuit breaker"
+    if isinstance(e, (requests.exceptions.ReadTimeout, aiohttp.SocketTimeoutError)):
+        return False
+    return isinstance(e, (requests.exceptions.ConnectionError, aiohttp.ClientConnectionError))
+
+def _retries(policy: CallPolicy) -> Iterator[float]:
+    "The delays between the retries of a call"
+    delays = policy.backoff.delays()
+    for _ in range(policy.retries):
+        d = next(delays, None)
+        if d is None:
+            return
+        yield d
+
+# ############################################################################ #
+# JSON Codec
+#
+# Requests are encoded to bytes and responses are decoded directly from the
+# response bytes. orjson or msgspec are used if installed; both are much
+# faster than the standard library for large responses like blocks with full
+# transactions or traces.
+
+@dataclass(frozen=True)
+class Codec:
+    "Encodes JSON-RPC requests to bytes and decodes responses from bytes"
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+def orjson_codec() -> Codec:
+    import orjson
+    return Codec("orjson", orjson.dumps, orjson.loads)
+
+def msgspec_codec() -> Codec:
+    import msgspec
+    return Codec("msgspec", msgspec.json.Encoder().encode, msgspec.json.Decoder().decode)
+
+def json_codec() -> Codec:
+    return Codec("json", lambda obj: json.dumps(obj).encode(), json.loads)
+
+# codecs in order of preference
+CODECS: dict[str, Callable[[], Codec]] = {
+    "orjson": orjson_codec,
+    "msgspec": msgspec_codec,
+    "json": json_codec,
+}
+
+def get_codec(name: str|None = None) -> Codec:
+    "Get the codec with the given name or the first codec that is installed"
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec {name!r}, expected one of {', '.join(CODECS)}")
+        return CODECS[name]()
+    for mk in CODECS.values():
+        try:
+            return mk()
+        except ImportError:
+            continue
+    return json_codec()
+
+DEFAULT_CODEC = get_codec(os.environ.get("PYRPC_CODEC"))
+
+# ############################################################################ #
+# HTTP Connection Pool
+#
+# All RPC clients share a single requests.Session by default, so that calls
+# reuse keep-alive connections to reth instead of doing a new TCP handshake for
+# each request.
+
+@dataclass(frozen=True)
+class PoolConfig:
+    "Settings for the pooled HTTP session used by RPC clients"
+
+    # Number of per-host connection pools that are cached. Should be at least
+    # the number of distinct endpoints (e.g. one per chain and port).
+    pool_connections: int = 16
+
+    # Maximum number of connections that are kept open per host.
+    pool_maxsize: int = 16
+
+    # Whether to block when all connections of a host are in use instead of
+    # opening additional, non-pooled connections.
+    pool_block: bool = False
+
+    # Whether to keep connections open between requests.
+    keep_alive: bool = True
+
+def mk_session(config: PoolConfig = PoolConfig()) -> requests.Session:
+    "Create a new HTTP session with a connection pool"
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=config.pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+_pool_config = PoolConfig()
+_pool_session: requests.Session|None = None
+_pool_lock = threading.Lock()
+
+def configure_pool(config: PoolConfig):
+    "Set the configuration of the shared session. Closes the current session."
+    global _pool_config
+    with _pool_lock:
+        _pool_config = config
+    close_pool()
+
+def get_pool() -> requests.Session:
+    "Get the shared HTTP session, creating it if needed"
+    global _pool_session
+    with _pool_lock:
+        if _pool_session is None:
+            _pool_session = mk_session(_pool_config)
+        return _pool_session
+
+def close_pool():
+    "Close the shared HTTP session and all of its connections"
+    global _pool_session
+    with _pool_lock:
+        session, _pool_session = _pool_session, None
+    if session is not None:
+        session.close()
+
 # ############################################################################ #
 # RPC
+#
+# Request building, response parsing and call policies are shared by the
+# synchronous and the asynchronous clients in RpcBase. The clients only differ
+# in the transport.
 
-class RPC:
-    "A simple JSON-RPC client"
-    def __init__(self, url: Url):
+class RpcBase:
+    "Transport independent parts of a JSON-RPC client"
+    def __init__(self, url: Url, session=None, policies: dict[Method, CallPolicy]|None = None, codec: Codec|None = None):
         self.url = url
         self.rid = 1
+        # a private session is owned and closed by the client, otherwise the
+        # shared session is used.
+        self._session = session
+        self.policies = METHOD_POLICIES | (policies or {})
+        self.breaker = get_breaker(url)
+        self.codec = codec or DEFAULT_CODEC
 
-    def rpc(self, method: Method, params: list|None = None, token: JwtToken|None = None):
-        "Make an RPC call"
-
+    def _next_id(self) -> int:
         rid = self.rid
         self.rid += 1
+        return rid
 
-        payload = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-            "id": rid,
-        }
+    def _auth_token(self, token: JwtToken|None) -> JwtToken|None:
+        "The bearer token for a request. Overwritten by authenticated clients."
+        return token
 
+    def _headers(self, token: JwtToken|None) -> dict[str, str]:
         headers = {
             "Content-Type": "application/json",
         }
-
+        token = self._auth_token(token)
         if token is not None:
             headers["Authorization"] = f"Bearer {token}"
+        return headers
 
-        r = requests.post(self.url, json=payload, headers=headers, timeout=1)
-        if r.status_code != 200:
-            msg = f"Http status code exception for method {method}: {r.text}"
-            print(msg)
-            raise RpcException(msg)
+    def policy(self, method: Method, policy: CallPolicy|None = None, timeout: float|None = None) -> CallPolicy:
+        """
+        The policy of a call. A given policy overrides the default of the
+        method, and a given timeout overrides the read timeout of the policy.
+        """
+        p = policy or self.policies.get(method, DEFAULT_POLICY)
+        return p if timeout is None else replace(p, read_timeout=timeout)
+
+    def _status_error(self, context: str, text: str) -> RpcHttpStatusException:
+        msg = f"Http status code exception for {context}: {text}"
+        print(msg)
+        return RpcHttpStatusException(msg)
 
-        j = r.json()
+    def _result(self, method: Method, params: list|None, rid: int, j: dict):
+        "The result of a decoded response. Raises RpcErrorException if the call failed."
         assert j.get("id") == rid, f"RPC response id mismatch. Expected {rid}, got {j.get('id')}"
 
         if j.get("error") is not None:
@@ -101,18 +469,372 @@ class RPC:
 
         return j.get("result")
 
+class RPC(RpcBase):
+    "A simple JSON-RPC client"
+    def __init__(self, url: Url, session: requests.Session|None = None, policies: dict[Method, CallPolicy]|None = None, codec: Codec|None = None):
+        super().__init__(url, session=session, policies=policies, codec=codec)
+
+    @property
+    def session(self) -> requests.Session:
+        "The HTTP session that is used for RPC calls"
+        if self._session is not None:
+            return self._session
+        return get_pool()
+
+    def close(self):
+        "Close a private session. The shared session is closed by close_pool."
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _post(self, payload: dict|list[dict], token: JwtToken|None, context: str, policy: CallPolicy = DEFAULT_POLICY):
+        "POST a JSON-RPC request object or batch and return the decoded response"
+        headers = self._headers(token)
+        data = self.codec.dumps(payload)
+        retries = _retries(policy)
+        while True:
+            self.breaker.check(self.url)
+            try:
+                r = self.session.post(self.url, data=data, headers=headers, timeout=policy.timeout)
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if _node_failure(e):
+                    self.breaker.failure()
+                delay = next(retries, None) if policy.idempotent or _not_sent(e) else None
+                if delay is None:
+                    raise
+                time.sleep(delay)
+        self.breaker.success()
+
+        if r.status_code != 200:
+            raise self._status_error(context, r.text)
+
+        return self.codec.loads(r.content)
+
+    def rpc(self, method: Method, params: list|None = None, token: JwtToken|None = None, *, policy: CallPolicy|None = None, timeout: float|None = None):
+        """
+        Make an RPC call. The policy or the read timeout of the call can be
+        overridden; otherwise the policy of the method is used.
+        """
+        rid = self._next_id()
+        p = self.policy(method, policy, timeout)
+        j = self._post(mk_request(method, params, rid), token, f"method {method}", p)
+        return self._result(method, params, rid, j)
+
+    def batch(self, calls: list[tuple[Method, list|None]]|None = None, token: JwtToken|None = None) -> "Batch":
+        """
+        Create a batch of RPC calls that are sent in a single request.
+
+        The batch is sent when the context manager exits or when `send` is
+        called. Errors of individual calls are raised by `BatchCall.result`.
+
+        Example:
+        ```
+        with client.batch() as b:
+            latest = b.call("eth_getBlockByNumber", ["latest", False])
+            safe = b.call("eth_getBlockByNumber", ["safe", False])
+        print(latest.result(), safe.result())
+        ```
+        """
+        return Batch(self, calls, token=token)
+
+    # Helpers for method definitions that are shared with the asynchronous
+    # client. They return values for this client and awaitables for the
+    # asynchronous client.
+
+    def _map(self, result, f: Callable):
+        "Apply a function to the result of a call"
+        return f(result)
+
+    def _batch_results(self, batches: list["Batch"]) -> list[list]:
+        "Send batches one after the other and return the results of each batch"
+        return [b.results() for b in batches]
+
+def mk_request(method: Method, params: list|None, rid: int) -> dict:
+    "Create a JSON-RPC request object"
+    return {
+        "jsonrpc": "2.0",
+        "method": method,
+        "params": params,
+        "id": rid,
+    }
+
+# ############################################################################ #
+# Batch RPC
+
+class BatchCall:
+    "A single call in a JSON-RPC batch"
+
+    def __init__(self, method: Method, params: list|None, rid: int):
+        self.method = method
+        self.params = params
+        self.id = rid
+        self.done = False
+        self._result = None
+        self._error: RpcException|None = None
+
+    def request(self) -> dict:
+        "The JSON-RPC request object for the call"
+        return mk_request(self.method, self.params, self.id)
+
+    def resolve(self, response: dict|None):
+        "Set the outcome of the call from its response object"
+        self.done = True
+        if response is None:
+            self._error = RpcException(f"No response for batch call {self.method} (id {self.id})")
+        elif response.get("error") is not None:
+            self._error = RpcErrorException(response.get("error"))
+        else:
+            self._result = response.get("result")
+
+    def result(self):
+        "Get the result of the call. Raises the error of the call if it failed."
+        if not self.done:
+            raise RpcException(f"Batch call {self.method} (id {self.id}) has not been sent")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+class Batch:
+    "A batch of JSON-RPC calls that is sent in a single POST request"
+
+    def __init__(self, client: "RPC|AsyncRPC", calls: list[tuple[Method, list|None]]|None = None, token: JwtToken|None = None):
+        self.client = client
+        self.token = token
+        self.calls: list[BatchCall] = []
+        for method, params in calls or []:
+            self.call(method, params)
+
+    def call(self, method: Method, params: list|None = None) -> BatchCall:
+        "Add a call to the batch"
+        c = BatchCall(method, params, self.client._next_id())
+        self.calls.append(c)
+        return c
+
+    def send(self) -> list[BatchCall]:
+        """
+        Send all pending calls of the batch. Responses are matched to calls by
+        id. Returns the calls in the order in which they were added.
+        """
+        pending = [c for c in self.calls if not c.done]
+        if len(pending) == 0:
+            return self.calls
+        j = self.client._post([c.request() for c in pending], self.token, f"batch of {len(pending)} calls", self.policy(pending))
+        self._resolve(pending, j)
+        return self.calls
+
+    def policy(self, pending: list[BatchCall]) -> CallPolicy:
+        "The policy of a batch. It allows for the slowest call and retries only if all calls can be retried."
+        policies = [self.client.policy(c.method) for c in pending]
+        p = policies[0]
+        for q in policies[1:]:
+            p = p.combine(q)
+        return p
+
+    def _resolve(self, pending: list[BatchCall], j: dict|list[dict]):
+        # The server responds with a single error object if the batch as a
+        # whole is invalid.
+        if isinstance(j, dict):
+            raise RpcErrorException(j.get("error"))
+
+        responses = {r.get("id"): r for r in j}
+        for c in pending:
+            c.resolve(responses.get(c.id))
+
+    def results(self) -> list:
+        "Send the batch and return the results. Raises the first error."
+        return [c.result() for c in self.send()]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.send()
+
 # ############################################################################ #
 # Authenticated RPC
 
-class AuthRPC(RPC):
-    "An authenticated JSON-RPC client"
-    def __init__(self, url: Url, jwt_secret):
-        super().__init__(url)
+class Authenticated:
+    "Bearer tokens for RPC clients. Mixed into the synchronous and asynchronous clients."
+    def __init__(self, url: Url, jwt_secret, session=None, policies: dict[Method, CallPolicy]|None = None, codec: Codec|None = None):
+        super().__init__(url, session=session, policies=policies, codec=codec)
         self.jwt_secret = jwt_secret
+        self.tokens = TokenCache(jwt_secret)
 
-    def rpc(self, method: Method, params: list|None = None, token: JwtToken|None = None):
-        "Make an authenticated RPC call"
+    def _auth_token(self, token: JwtToken|None) -> JwtToken:
+        "The bearer token for a request. The cached token is used if none is given."
         if token is None:
-            token = mk_token(self.jwt_secret)
-        return super().rpc(method, params, token=token)
+            token = self.tokens.get()
+        return token
+
+class AuthRPC(Authenticated, RPC):
+    "An authenticated JSON-RPC client"
+
+# ############################################################################ #
+# Asynchronous RPC
+#
+# The asynchronous clients use aiohttp and do not block the event loop. Clients
+# in the same event loop share a single aiohttp.ClientSession, which is
+# configured from the same PoolConfig as the synchronous session.
+
+#
+# Pooled sessions are bound to the event loop in which they are created, so
+# there is one pooled session per event loop. Each is closed when the tasks of
+# its loop are cancelled on shutdown, as asyncio.run does, or by
+# close_async_pool.
+
+_async_pool_sessions: dict[asyncio.AbstractEventLoop, tuple[aiohttp.ClientSession, asyncio.Task]] = {}
+
+def mk_async_session(config: PoolConfig = PoolConfig()) -> aiohttp.ClientSession:
+    "Create a new aiohttp session with a connection pool"
+    connector = aiohttp.TCPConnector(
+        limit=config.pool_connections * config.pool_maxsize,
+        limit_per_host=config.pool_maxsize,
+        force_close=not config.keep_alive,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+async def _close_on_shutdown(loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession):
+    "Wait until cancelled, then close the pooled session of the loop"
+    try:
+        await asyncio.Future()
+    finally:
+        with _pool_lock:
+            if _async_pool_sessions.get(loop, (None,))[0] is session:
+                del _async_pool_sessions[loop]
+        await session.close()
+
+def get_async_pool() -> aiohttp.ClientSession:
+    "Get the shared aiohttp session for the running event loop"
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        # drop entries of loops that were closed without cancelling tasks
+        for l in [l for l in _async_pool_sessions if l.is_closed()]:
+            del _async_pool_sessions[l]
+        entry = _async_pool_sessions.get(loop)
+        if entry is not None and not entry[0].closed:
+            return entry[0]
+        session = mk_async_session(_pool_config)
+        task = loop.create_task(_close_on_shutdown(loop, session))
+        _async_pool_sessions[loop] = (session, task)
+        return session
+
+async def close_async_pool():
+    "Close the shared aiohttp session of the running event loop and all of its connections"
+    with _pool_lock:
+        entry = _async_pool_sessions.get(asyncio.get_running_loop())
+    if entry is not None:
+        session, task = entry
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+class AsyncRPC(RpcBase):
+    "A simple asynchronous JSON-RPC client"
+    def __init__(self, url: Url, session: aiohttp.ClientSession|None = None, policies: dict[Method, CallPolicy]|None = None, codec: Codec|None = None):
+        super().__init__(url, session=session, policies=policies, codec=codec)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        "The HTTP session that is used for RPC calls"
+        if self._session is not None:
+            return self._session
+        return get_async_pool()
+
+    async def close(self):
+        "Close a private session. The shared session is closed by close_async_pool."
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _post(self, payload: dict|list[dict], token: JwtToken|None, context: str, policy: CallPolicy = DEFAULT_POLICY):
+        "POST a JSON-RPC request object or batch and return the decoded response"
+        headers = self._headers(token)
+        timeout = aiohttp.ClientTimeout(total=None, connect=policy.connect_timeout, sock_read=policy.read_timeout)
+        data = self.codec.dumps(payload)
+        retries = _retries(policy)
+        while True:
+            self.breaker.check(self.url)
+            try:
+                async with self.session.post(self.url, data=data, headers=headers, timeout=timeout) as r:
+                    if r.status != 200:
+                        self.breaker.success()
+                        raise self._status_error(context, await r.text())
+                    j = self.codec.loads(await r.read())
+                self.breaker.success()
+                return j
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if _node_failure(e):
+                    self.breaker.failure()
+                delay = next(retries, None) if policy.idempotent or _not_sent(e) else None
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def rpc(self, method: Method, params: list|None = None, token: JwtToken|None = None, *, policy: CallPolicy|None = None, timeout: float|None = None):
+        """
+        Make an RPC call. The policy or the read timeout of the call can be
+        overridden; otherwise the policy of the method is used.
+        """
+        rid = self._next_id()
+        p = self.policy(method, policy, timeout)
+        j = await self._post(mk_request(method, params, rid), token, f"method {method}", p)
+        return self._result(method, params, rid, j)
+
+    def batch(self, calls: list[tuple[Method, list|None]]|None = None, token: JwtToken|None = None) -> "AsyncBatch":
+        """
+        Create a batch of RPC calls that are sent in a single request. The
+        batch is sent when the async context manager exits or when `send` is
+        awaited.
+        """
+        return AsyncBatch(self, calls, token=token)
+
+    async def _map(self, result, f: Callable):
+        "Apply a function to the result of a call"
+        return f(await result)
+
+    async def _batch_results(self, batches: list["AsyncBatch"]) -> list[list]:
+        "Send batches one after the other and return the results of each batch"
+        return [await b.results() for b in batches]
+
+class AsyncBatch(Batch):
+    "A batch of JSON-RPC calls that is sent asynchronously in a single POST request"
+
+    async def send(self) -> list[BatchCall]:
+        """
+        Send all pending calls of the batch. Responses are matched to calls by
+        id. Returns the calls in the order in which they were added.
+        """
+        pending = [c for c in self.calls if not c.done]
+        if len(pending) == 0:
+            return self.calls
+        j = await self.client._post([c.request() for c in pending], self.token, f"batch of {len(pending)} calls", self.policy(pending))
+        self._resolve(pending, j)
+        return self.calls
+
+    async def results(self) -> list:
+        "Send the batch and return the results. Raises the first error."
+        return [c.result() for c in await self.send()]
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' for asynchronous batches")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *exc):
+        if exc_type is None:
+            await self.send()
 
+class AsyncAuthRPC(Authenticated, AsyncRPC):
+    "An authenticated asynchronous JSON-RPC client"